@@ -3,20 +3,47 @@ This module defines the controller for session management functionality.
 It handles the business logic for creating sessions and processing questions.
 """
 
-from typing import Any, Dict
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
+from config import config
 from crud import (
+    CachedAnswer,
     ChatCrud,
     ChatSessionCrud,
     ChatSessions,
     DocumentChunkCrud,
     DocumentCrud,
     Documents,
+    EmbeddingCacheCrud,
+    SearchHit,
 )
 from fastapi import HTTPException
-from schemas import ChatSessionCreate, QuestionRequest
+from fastapi.encoders import jsonable_encoder
+from openai import APIError
+from schemas import (
+    BatchQuestionRequest,
+    ChatSessionCreate,
+    OpenAIModel,
+    QuestionRequest,
+    SearchMode,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from utils import chat_completion, get_vector, logger
+from utils import (
+    MAX_OUTPUT_TOKENS,
+    chat_completion,
+    compress_texts,
+    condense_question,
+    context_budget,
+    estimate_tokens,
+    logger,
+    pack_texts,
+    stream_chat_completion,
+    summarize_conversation,
+)
+from utils.session import async_session_factory
 
 
 class ChatController:
@@ -33,6 +60,7 @@ class ChatController:
         self.chat_session_crud = ChatSessionCrud()
         self.chat_crud = ChatCrud()
         self.document_chunk_crud = DocumentChunkCrud()
+        self.embedding_cache_crud = EmbeddingCacheCrud()
 
     async def create_chat_session(
         self, *, session: AsyncSession, chat_session_data: ChatSessionCreate
@@ -61,6 +89,19 @@ class ChatController:
         )
         return {"session_id": chat_session.id}
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Returns the hit and miss counters of the answer and embedding caches since startup.
+
+        Returns:
+            Dict[str, Any]: The counters of each cache.
+        """
+        logger.info("Inside chat controller, executing get_cache_stats ...")
+        return {
+            "answers": self.chat_crud.stats(),
+            "embeddings": self.embedding_cache_crud.stats(),
+        }
+
     async def ask_question(
         self,
         *,
@@ -69,7 +110,11 @@ class ChatController:
         chat_session_id: int,
     ) -> Dict[str, Any]:
         """
-        Process a user question by performing a similarity search and generating a response.
+        Process a user question by searching the document's chunks and generating a response.
+        The chunks can be compressed to their sentences most relevant to the question, and
+        are packed into the context by relevance, within the tokens the model's context
+        window leaves after the prompt, the session's history and `max_tokens`. A cached
+        answer is returned instead when one is found, flagged as `cached`.
 
         Args:
             session (AsyncSession): The database session.
@@ -85,24 +130,43 @@ class ChatController:
         )
         if not chat_session:
             raise HTTPException(status_code=404, detail="Session not found.")
-        vector, usage = await get_vector(text=question_info.question)
-        similarities_top_three = await self.document_chunk_crud.similarity_search(
-            session=session,
-            search_query_vector=vector,
-            document_id=chat_session.document_id,
+        summary, history, history_usage = await self._load_history(
+            session=session, question_info=question_info, chat_session=chat_session
+        )
+        budget = self._context_budget(
+            system_message=chat_session.system_message,
+            question=question_info.question,
+            max_tokens=question_info.max_tokens,
+            model=question_info.model,
+            summary=summary,
+            history=history,
         )
-        context = "\n\n".join(
-            [
-                f"{chunk.content} page_number {chunk.page_number}"
-                for chunk in similarities_top_three
-            ]
+        query, query_usage = await self._condense_question(
+            question_info=question_info, summary=summary, history=history
         )
+        cached, cache_fields, similar_chunks, usage = await self._prepare_answer(
+            session=session,
+            question_info=question_info,
+            chat_session=chat_session,
+            query=query,
+        )
+        usage += history_usage + query_usage
+        if cached:
+            return await self._create_cached_chat(
+                session=session,
+                question_info=question_info,
+                chat_session_id=chat_session_id,
+                cached=cached,
+                usage=usage,
+            )
         answer, chat_id, answer_usage = await chat_completion(
-            context=context,
+            context=self._build_context(similar_chunks, budget),
             system_message=chat_session.system_message,
             question=question_info.question,
             max_tokens=question_info.max_tokens,
             model=question_info.model,
+            summary=summary,
+            history=history,
         )
         new_chat_obj = {
             "session_id": chat_session_id,
@@ -114,9 +178,785 @@ class ChatController:
                 "model": question_info.model,
             },
         }
+        chat_obj = await self.chat_crud.create(
+            session=session, create_obj={**new_chat_obj, **cache_fields}
+        )
+        return {
+            **new_chat_obj,
+            "chat_id": chat_obj.id,
+            "created_at": chat_obj.created_at,
+            "cached": False,
+        }
+
+    async def ask_question_stream(
+        self,
+        *,
+        session: AsyncSession,
+        question_info: QuestionRequest,
+        chat_session_id: int,
+    ) -> AsyncIterator[str]:
+        """
+        Process a user question like `ask_question`, streaming the answer as Server-Sent Events.
+        The session is checked and the chunks are retrieved before the stream starts, so
+        errors at that stage are regular HTTP errors. The stream then sends a `delta` event
+        for each part of the answer, and once the answer is complete, stores the chat and
+        sends it in a `done` event. A failed completion sends an `error` event and stores nothing.
+        A cached answer is sent in a single `delta` event.
+
+        Args:
+            session (AsyncSession): The database session.
+            question_info (QuestionRequest): The question details including text, model, and max tokens.
+            chat_session_id (int): The ID of the chat session.
+
+        Returns:
+            AsyncIterator[str]: The events of the answer.
+        """
+        logger.info("Inside chat controller, executing ask_question_stream ...")
+        chat_session = await self.chat_session_crud.get(
+            session=session, field=ChatSessions.id, value=chat_session_id
+        )
+        if not chat_session:
+            raise HTTPException(status_code=404, detail="Session not found.")
+        summary, history, history_usage = await self._load_history(
+            session=session, question_info=question_info, chat_session=chat_session
+        )
+        budget = self._context_budget(
+            system_message=chat_session.system_message,
+            question=question_info.question,
+            max_tokens=question_info.max_tokens,
+            model=question_info.model,
+            summary=summary,
+            history=history,
+        )
+        query, query_usage = await self._condense_question(
+            question_info=question_info, summary=summary, history=history
+        )
+        cached, cache_fields, similar_chunks, usage = await self._prepare_answer(
+            session=session,
+            question_info=question_info,
+            chat_session=chat_session,
+            query=query,
+        )
+        usage += history_usage + query_usage
+        if cached:
+            cached_chat = await self._create_cached_chat(
+                session=session,
+                question_info=question_info,
+                chat_session_id=chat_session_id,
+                cached=cached,
+                usage=usage,
+            )
+
+            async def cached_events() -> AsyncIterator[str]:
+                yield self._sse("delta", {"content": cached_chat["answer"]})
+                yield self._sse("done", cached_chat)
+
+            return cached_events()
+
+        async def events() -> AsyncIterator[str]:
+            parts, chat_id, answer_usage = [], "", 0
+            try:
+                async for delta, chat_id, completion_usage in stream_chat_completion(
+                    context=self._build_context(similar_chunks, budget),
+                    system_message=chat_session.system_message,
+                    question=question_info.question,
+                    max_tokens=question_info.max_tokens,
+                    model=question_info.model,
+                    summary=summary,
+                    history=history,
+                ):
+                    if delta:
+                        parts.append(delta)
+                        yield self._sse("delta", {"content": delta})
+                    answer_usage = completion_usage or answer_usage
+            except APIError as exc:
+                logger.error(f"Streamed completion failed: {exc}")
+                yield self._sse("error", {"message": exc.message})
+                return
+            new_chat_obj = {
+                "session_id": chat_session_id,
+                "question": question_info.question,
+                "answer": "".join(parts),
+                "metadata_info": {
+                    "chat_completion_id": chat_id,
+                    "usage": answer_usage + usage,
+                    "model": question_info.model,
+                },
+            }
+            # The request's session is closed once the response starts.
+            async with async_session_factory() as write_session:
+                chat_obj = await self.chat_crud.create(
+                    session=write_session, create_obj={**new_chat_obj, **cache_fields}
+                )
+            yield self._sse(
+                "done",
+                {
+                    **new_chat_obj,
+                    "chat_id": chat_obj.id,
+                    "created_at": chat_obj.created_at,
+                    "cached": False,
+                },
+            )
+
+        return events()
+
+    async def ask_questions(
+        self,
+        *,
+        session: AsyncSession,
+        questions_info: BatchQuestionRequest,
+        chat_session_id: int,
+    ) -> Dict[str, Any]:
+        """
+        Process many user questions of a session together. The questions are embedded
+        in one embeddings request, their completions run concurrently up to
+        `BATCH_COMPLETION_CONCURRENCY`, and the chats are stored with a single insert.
+        Chunks are retrieved with the same search options as a single question: in
+        vector mode without maximal marginal relevance the questions are searched in
+        one query, otherwise the questions are retrieved concurrently, each in its own
+        session, up to `BATCH_SEARCH_CONCURRENCY` at a time.
+
+        Args:
+            session (AsyncSession): The database session.
+            questions_info (BatchQuestionRequest): The questions, model, max tokens and search options.
+            chat_session_id (int): The ID of the chat session.
+
+        Returns:
+            Dict[str, Any]: The session ID and the generated response of each question, in order.
+        """
+        logger.info("Inside chat controller, executing ask_questions ...")
+        chat_session = await self.chat_session_crud.get(
+            session=session, field=ChatSessions.id, value=chat_session_id
+        )
+        if not chat_session:
+            raise HTTPException(status_code=404, detail="Session not found.")
+        budgets = [
+            self._context_budget(
+                system_message=chat_session.system_message,
+                question=question,
+                max_tokens=questions_info.max_tokens,
+                model=questions_info.model,
+            )
+            for question in questions_info.questions
+        ]
+        embeddings = await self._embed_questions(
+            session=session, questions_info=questions_info, chat_session=chat_session
+        )
+        search_mode = questions_info.search_mode or config.SEARCH_MODE
+        diversify = (
+            questions_info.mmr_lambda < 1 and questions_info.fetch_k > questions_info.k
+        )
+        if search_mode == SearchMode.VECTOR and not diversify:
+            similar_chunks = await self.document_chunk_crud.batch_similarity_search(
+                session=session,
+                document_id=chat_session.document_id,
+                search_query_vectors=[vector for vector, _ in embeddings],
+                k=questions_info.k,
+            )
+        else:
+            options = questions_info.model_dump(exclude={"questions"})
+            searches = asyncio.Semaphore(config.BATCH_SEARCH_CONCURRENCY)
+
+            async def retrieve(question: str, vector: Optional[np.ndarray]):
+                async with searches, async_session_factory() as search_session:
+                    return await self._retrieve(
+                        session=search_session,
+                        question_info=QuestionRequest(question=question, **options),
+                        chat_session=chat_session,
+                        query=question,
+                        vector=vector,
+                    )
+
+            similar_chunks = await asyncio.gather(
+                *(
+                    retrieve(question, vector)
+                    for question, (vector, _) in zip(
+                        questions_info.questions, embeddings
+                    )
+                )
+            )
+        # Releases the locks of the searches before the answers are generated.
+        await session.commit()
+        semaphore = asyncio.Semaphore(config.BATCH_COMPLETION_CONCURRENCY)
+
+        async def complete(question: str, chunks: List[SearchHit], budget: int):
+            async with semaphore:
+                chunks = self._compress(
+                    chunks=chunks,
+                    question=question,
+                    ratio=questions_info.compression_ratio
+                    or config.CONTEXT_COMPRESSION_RATIO,
+                )
+                return await chat_completion(
+                    context=self._build_context(chunks, budget),
+                    system_message=chat_session.system_message,
+                    question=question,
+                    max_tokens=questions_info.max_tokens,
+                    model=questions_info.model,
+                )
+
+        completions = await asyncio.gather(
+            *(
+                complete(question, chunks, budget)
+                for question, chunks, budget in zip(
+                    questions_info.questions, similar_chunks, budgets
+                )
+            )
+        )
+        new_chat_objs = [
+            {
+                "session_id": chat_session_id,
+                "question": question,
+                "answer": answer,
+                "metadata_info": {
+                    "chat_completion_id": chat_id,
+                    "usage": answer_usage + usage,
+                    "model": questions_info.model,
+                },
+            }
+            for question, (answer, chat_id, answer_usage), (_, usage) in zip(
+                questions_info.questions, completions, embeddings
+            )
+        ]
+        chat_rows = await self.chat_crud.create_many(
+            session=session, create_objs=new_chat_objs
+        )
+        return {
+            "session_id": chat_session_id,
+            "chats": [
+                {
+                    **new_chat_obj,
+                    "chat_id": chat_row.id,
+                    "created_at": chat_row.created_at,
+                }
+                for new_chat_obj, chat_row in zip(new_chat_objs, chat_rows)
+            ],
+        }
+
+    async def _embed_questions(
+        self,
+        *,
+        session: AsyncSession,
+        questions_info: BatchQuestionRequest,
+        chat_session: ChatSessions,
+    ) -> List[Tuple[Optional[np.ndarray], int]]:
+        """
+        Embeds the questions of a batch for the search of their chunks, like `_embed_question`
+        without the answer cache: questions in lexical mode are not embedded, and unless the
+        search mode is vector, questions whose embeddings fail or take longer than
+        `QUERY_EMBEDDING_TIMEOUT` are searched without them.
+
+        Args:
+            session (AsyncSession): The database session.
+            questions_info (BatchQuestionRequest): The questions and their search options.
+            chat_session (ChatSessions): The chat session of the questions.
+
+        Returns:
+            List[Tuple[Optional[np.ndarray], int]]: The embedding, or None, and the number of
+                tokens used to embed each question, in order.
+        """
+        search_mode = questions_info.search_mode or config.SEARCH_MODE
+        skipped = [(None, 0)] * len(questions_info.questions)
+        if search_mode == SearchMode.LEXICAL:
+            return skipped
+        document = await self.document_crud.get(
+            session=session, field=Documents.id, value=chat_session.document_id
+        )
+        required = search_mode == SearchMode.VECTOR
+        try:
+            return await self.embedding_cache_crud.get_vectors(
+                session=session,
+                texts=questions_info.questions,
+                dimensions=document.embedding_dimensions,
+                timeout=None if required else config.QUERY_EMBEDDING_TIMEOUT,
+            )
+        except (APIError, asyncio.TimeoutError) as exc:
+            if required:
+                raise
+            logger.warning(
+                f"Question embeddings failed, answering without them: {exc!r}"
+            )
+            return skipped
+
+    async def _load_history(
+        self,
+        *,
+        session: AsyncSession,
+        question_info: QuestionRequest,
+        chat_session: ChatSessions,
+    ) -> Tuple[str, List[Tuple[str, str]], int]:
+        """
+        Loads the conversation memory of a session: up to `HISTORY_TURNS` of its latest turns,
+        kept verbatim within `HISTORY_MAX_TOKENS`, and a rolling summary of the turns before them.
+        The verbatim turns are always the latest ones, without a gap: the first turn that
+        does not fit ends the window, and it and every older turn go to the summary.
+        Turns that left the verbatim window since the last question are folded into the
+        summary, which is stored in the session's `metadata_info`, so each question only
+        summarizes the turns it evicts and the memory stays the same size however long the
+        session runs. Evicted turns are summarized `HISTORY_TURNS` at a time, oldest first,
+        with at most `HISTORY_SUMMARY_MAX_CALLS` updates per question, so a question costs
+        the same however many turns were evicted since the last one. The remaining turns,
+        like those of a failed update, are summarized by the next questions: until then the
+        summary lags behind the verbatim window.
+
+        Args:
+            session (AsyncSession): The database session.
+            question_info (QuestionRequest): The question details, including `use_history`.
+            chat_session (ChatSessions): The chat session of the question.
+
+        Returns:
+            str: The summary of the older turns, empty if there is none.
+            List[Tuple[str, str]]: The question and answer of each recent turn, oldest first.
+            int: The number of tokens used to update the summary.
+        """
+        if not question_info.use_history or not config.HISTORY_TURNS:
+            return "", [], 0
+        memory = chat_session.metadata_info.get("memory", {})
+        summary = memory.get("summary", "")
+        summarized_chat_id = memory.get("summarized_chat_id", 0)
+        window = await self.chat_crud.get_turns(
+            session=session,
+            session_id=chat_session.id,
+            limit=config.HISTORY_TURNS,
+            after_id=summarized_chat_id,
+        )
+        if not window:
+            return summary, [], 0
+        recent_turns, used = [], 0
+        for turn in reversed(window):
+            used += estimate_tokens(f"{turn.question}\n{turn.answer}")
+            if used > config.HISTORY_MAX_TOKENS:
+                break
+            recent_turns.insert(0, turn)
+        evicted = await self.chat_crud.get_turns(
+            session=session,
+            session_id=chat_session.id,
+            limit=config.HISTORY_TURNS * config.HISTORY_SUMMARY_MAX_CALLS,
+            after_id=summarized_chat_id,
+            before_id=recent_turns[0].id if recent_turns else window[-1].id + 1,
+            oldest=True,
+        )
+        usage = 0
+        for start in range(0, len(evicted), config.HISTORY_TURNS):
+            batch = evicted[start : start + config.HISTORY_TURNS]
+            try:
+                summary, completion_tokens = await summarize_conversation(
+                    summary=summary,
+                    turns=[(turn.question, turn.answer) for turn in batch],
+                    max_tokens=config.HISTORY_SUMMARY_TOKENS,
+                    model=config.HISTORY_SUMMARY_MODEL,
+                )
+            except APIError as exc:
+                logger.warning(f"Conversation summary update failed: {exc}")
+                break
+            usage += completion_tokens
+            summarized_chat_id = batch[-1].id
+        if summarized_chat_id != memory.get("summarized_chat_id", 0):
+            chat_session.metadata_info = {
+                **chat_session.metadata_info,
+                "memory": {
+                    "summary": summary,
+                    "summarized_chat_id": summarized_chat_id,
+                },
+            }
+            await session.commit()
+        return summary, [(turn.question, turn.answer) for turn in recent_turns], usage
+
+    @staticmethod
+    async def _condense_question(
+        *,
+        question_info: QuestionRequest,
+        summary: str,
+        history: Sequence[Tuple[str, str]],
+    ) -> Tuple[Optional[str], int]:
+        """
+        Rewrites a question asked with the history of its session as a standalone question,
+        which is searched instead of it, since a follow-up question alone often misses the
+        chunks it refers to. The question itself is searched if the rewrite fails.
+
+        Args:
+            question_info (QuestionRequest): The question details.
+            summary (str): The summary of the session's older turns.
+            history (Sequence[Tuple[str, str]]): The recent turns of the session.
+
+        Returns:
+            Optional[str]: The standalone question, or None for a question without history.
+            int: The number of tokens used to rewrite the question.
+        """
+        if not (summary or history):
+            return None, 0
+        try:
+            return await condense_question(
+                summary=summary,
+                history=history,
+                question=question_info.question,
+                max_tokens=estimate_tokens(question_info.question)
+                + config.HISTORY_SUMMARY_TOKENS,
+                model=config.HISTORY_SUMMARY_MODEL,
+            )
+        except APIError as exc:
+            logger.warning(f"Question rewrite failed, searching the question: {exc}")
+            return question_info.question, 0
+
+    async def _embed_question(
+        self,
+        *,
+        session: AsyncSession,
+        question_info: QuestionRequest,
+        chat_session: ChatSessions,
+        query: str,
+        use_cache: bool,
+    ) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Embeds a question for the answer cache and the search of its chunks. Only vector
+        search requires the embedding: otherwise a question whose embedding fails or takes
+        longer than `QUERY_EMBEDDING_TIMEOUT` is answered without it, and a question in
+        lexical mode that does not use the answer cache is not embedded at all.
+
+        Args:
+            session (AsyncSession): The database session.
+            question_info (QuestionRequest): The question details including text and search options.
+            chat_session (ChatSessions): The chat session of the question.
+            query (str): The text searched for the question.
+            use_cache (bool): Whether the embedding is looked up in the answer cache.
+
+        Returns:
+            Optional[np.ndarray]: The embedding of the question, or None.
+            int: The number of tokens used to embed the question.
+        """
+        search_mode = question_info.search_mode or config.SEARCH_MODE
+        if search_mode == SearchMode.LEXICAL and not use_cache:
+            return None, 0
+        document = await self.document_crud.get(
+            session=session, field=Documents.id, value=chat_session.document_id
+        )
+        required = search_mode == SearchMode.VECTOR
+        try:
+            return await self.embedding_cache_crud.get_vector(
+                session=session,
+                text=query,
+                dimensions=document.embedding_dimensions,
+                timeout=None if required else config.QUERY_EMBEDDING_TIMEOUT,
+            )
+        except (APIError, asyncio.TimeoutError) as exc:
+            if required:
+                raise
+            logger.warning(f"Question embedding failed, answering without it: {exc!r}")
+            return None, 0
+
+    async def _prepare_answer(
+        self,
+        *,
+        session: AsyncSession,
+        question_info: QuestionRequest,
+        chat_session: ChatSessions,
+        query: Optional[str] = None,
+    ) -> Tuple[Optional[CachedAnswer], Dict[str, Any], List[SearchHit], int]:
+        """
+        Looks up the answer of a question in the answer caches, and otherwise retrieves
+        the chunks to answer it from. Unless the question opts out with `use_cache`, the
+        answer of an identical request made less than `RESPONSE_CACHE_TTL` ago is reused
+        without embedding the question; otherwise, the answer of a question of the same
+        document, system message and model at least `ANSWER_CACHE_SIMILARITY` similar.
+        A question asked with the history of its session depends on that history, so it
+        neither uses nor feeds the answer caches, and its standalone form is searched instead.
+        Neither does an answer retrieved with full-text search only because the question's
+        embedding failed, so the degraded answer is not reused once embeddings recover.
+
+        Args:
+            session (AsyncSession): The database session.
+            question_info (QuestionRequest): The question details including text, model and search options.
+            chat_session (ChatSessions): The chat session of the question.
+            query (Optional[str]): The standalone form of a question asked with history (default: none).
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer, or None.
+            Dict[str, Any]: The answer cache fields of the new chat.
+            List[SearchHit]: The retrieved chunks, compressed to the question's `compression_ratio`
+                or `CONTEXT_COMPRESSION_RATIO`, empty for a cached answer.
+            int: The number of tokens used to embed the question.
+        """
+        search_mode = question_info.search_mode or config.SEARCH_MODE
+        compression_ratio = (
+            question_info.compression_ratio or config.CONTEXT_COMPRESSION_RATIO
+        )
+        standalone = query is None
+        query = query or question_info.question
+        use_cache = question_info.use_cache and standalone
+        response_key = self.chat_crud.response_cache_key(
+            document_id=chat_session.document_id,
+            question=question_info.question,
+            system_message=chat_session.system_message,
+            model=question_info.model,
+            max_tokens=question_info.max_tokens,
+            search_options={
+                "search_mode": search_mode,
+                "k": question_info.k,
+                "fetch_k": question_info.fetch_k,
+                "mmr_lambda": question_info.mmr_lambda,
+                "compression_ratio": compression_ratio,
+            },
+        )
+        if use_cache and (
+            cached := await self.chat_crud.get_cached_response(
+                session=session, response_key=response_key
+            )
+        ):
+            return cached, {}, [], 0
+        vector, usage = await self._embed_question(
+            session=session,
+            question_info=question_info,
+            chat_session=chat_session,
+            query=query,
+            use_cache=use_cache,
+        )
+        degraded = vector is None and search_mode != SearchMode.LEXICAL
+        cache_fields = (
+            {"response_key": response_key} if standalone and not degraded else {}
+        )
+        if vector is not None and standalone:
+            cache_fields["question_embedding"] = vector.tolist()
+            cache_fields["cache_key"] = self.chat_crud.answer_cache_key(
+                document_id=chat_session.document_id,
+                system_message=chat_session.system_message,
+                model=question_info.model,
+            )
+            if use_cache and (
+                cached := await self.chat_crud.get_cached_answer(
+                    session=session,
+                    cache_key=cache_fields["cache_key"],
+                    question_vector=vector,
+                    min_similarity=config.ANSWER_CACHE_SIMILARITY,
+                )
+            ):
+                return cached, {}, [], usage
+        similar_chunks = await self._retrieve(
+            session=session,
+            question_info=question_info,
+            chat_session=chat_session,
+            query=query,
+            vector=vector,
+        )
+        similar_chunks = self._compress(
+            chunks=similar_chunks,
+            question=query,
+            ratio=compression_ratio,
+        )
+        # Releases the locks of the search before the answer is generated.
+        await session.commit()
+        return None, cache_fields, similar_chunks, usage
+
+    async def _create_cached_chat(
+        self,
+        *,
+        session: AsyncSession,
+        question_info: QuestionRequest,
+        chat_session_id: int,
+        cached: CachedAnswer,
+        usage: int,
+    ) -> Dict[str, Any]:
+        """
+        Stores a cached answer as a chat of the session. The chat is not itself an entry
+        of the answer caches, and only costs the question's embedding, if any.
+
+        Args:
+            session (AsyncSession): The database session.
+            question_info (QuestionRequest): The question details including text and model.
+            chat_session_id (int): The ID of the chat session.
+            cached (CachedAnswer): The cached answer.
+            usage (int): The number of tokens used to embed the question.
+
+        Returns:
+            Dict[str, Any]: The cached response along with metadata and chat details.
+        """
+        new_chat_obj = {
+            "session_id": chat_session_id,
+            "question": question_info.question,
+            "answer": cached.answer,
+            "metadata_info": {
+                "chat_completion_id": cached.chat_completion_id,
+                "usage": usage,
+                "model": question_info.model,
+                "cached_chat_id": cached.chat_id,
+            },
+        }
         chat_obj = await self.chat_crud.create(session=session, create_obj=new_chat_obj)
         return {
             **new_chat_obj,
             "chat_id": chat_obj.id,
             "created_at": chat_obj.created_at,
+            "cached": True,
         }
+
+    async def _retrieve(
+        self,
+        *,
+        session: AsyncSession,
+        question_info: QuestionRequest,
+        chat_session: ChatSessions,
+        query: str,
+        vector: Optional[np.ndarray],
+    ) -> List[SearchHit]:
+        """
+        Retrieves the chunks of a session's document used to answer a question.
+        Chunks are retrieved with the question's search mode, or `SEARCH_MODE` by default.
+        A question without an embedding is answered with full-text search only.
+        The question's `k` chunks are used as context; in vector mode they are selected
+        by maximal marginal relevance among the `fetch_k` most similar chunks.
+
+        Args:
+            session (AsyncSession): The database session.
+            question_info (QuestionRequest): The question details including text and search options.
+            chat_session (ChatSessions): The chat session of the question.
+            query (str): The text searched for the question.
+            vector (Optional[np.ndarray]): The embedding of the question.
+
+        Returns:
+            List[SearchHit]: The retrieved chunks.
+        """
+        search_mode = question_info.search_mode or config.SEARCH_MODE
+        if vector is None or search_mode == SearchMode.LEXICAL:
+            similar_chunks = await self.document_chunk_crud.lexical_search(
+                session=session,
+                query=query,
+                document_id=chat_session.document_id,
+                limit=question_info.k,
+            )
+        elif search_mode == SearchMode.HYBRID:
+            similar_chunks = await self.document_chunk_crud.hybrid_search(
+                session=session,
+                query=query,
+                search_query_vector=vector,
+                document_id=chat_session.document_id,
+                limit=question_info.k,
+            )
+        else:
+            similar_chunks = await self.document_chunk_crud.similarity_search(
+                session=session,
+                search_query_vector=vector,
+                document_id=chat_session.document_id,
+                k=question_info.k,
+                fetch_k=question_info.fetch_k,
+                mmr_lambda=question_info.mmr_lambda,
+            )
+        return similar_chunks
+
+    @staticmethod
+    def _sse(event: str, data: Dict[str, Any]) -> str:
+        """
+        Formats a Server-Sent Event with a JSON payload.
+
+        Args:
+            event (str): The name of the event.
+            data (Dict[str, Any]): The payload of the event.
+
+        Returns:
+            str: The event, terminated by a blank line.
+        """
+        return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+    @staticmethod
+    def _context_budget(
+        *,
+        system_message: str,
+        question: str,
+        max_tokens: Optional[int],
+        model: str,
+        summary: str = "",
+        history: Sequence[Tuple[str, str]] = (),
+    ) -> int:
+        """
+        Checks that a question fits the model, and returns the number of tokens left for its context.
+
+        Args:
+            system_message (str): The system message of the chat session.
+            question (str): The user's question.
+            max_tokens (Optional[int]): The maximum number of tokens of the answer.
+            model (str): The chat model.
+            summary (str): The summary of the session's older turns (default: none).
+            history (Sequence[Tuple[str, str]]): The recent turns of the session (default: none).
+
+        Returns:
+            int: The number of tokens available for the context.
+        """
+        model = OpenAIModel(model).value
+        if max_tokens and max_tokens > MAX_OUTPUT_TOKENS[model]:
+            raise HTTPException(
+                status_code=422,
+                detail=f"max_tokens should be at most {MAX_OUTPUT_TOKENS[model]} for {model}.",
+            )
+        budget = context_budget(
+            system_message=system_message,
+            question=question,
+            max_tokens=max_tokens,
+            model=model,
+            summary=summary,
+            history=history,
+        )
+        if budget <= 0:
+            raise HTTPException(
+                status_code=422,
+                detail=f"The question and max_tokens exceed the context window of {model}.",
+            )
+        return budget
+
+    @staticmethod
+    def _compress(
+        *, chunks: List[SearchHit], question: str, ratio: float
+    ) -> List[SearchHit]:
+        """
+        Keeps the sentences of the retrieved chunks most relevant to the question, up to
+        `ratio` of their text. Chunks keep their page range; a chunk without any kept
+        sentence is left out.
+
+        Args:
+            chunks (List[SearchHit]): The retrieved chunks, most relevant first.
+            question (str): The user's question.
+            ratio (float): The share of the chunks' text to keep (1 to keep everything).
+
+        Returns:
+            List[SearchHit]: The compressed chunks, in the same order.
+        """
+        if ratio >= 1:
+            return chunks
+        contents = compress_texts(
+            question=question, texts=[chunk.content for chunk in chunks], ratio=ratio
+        )
+        return [
+            SearchHit(
+                chunk.chunk_id,
+                chunk.page_number,
+                chunk.page_end,
+                content,
+                chunk.distance,
+            )
+            for chunk, content in zip(chunks, contents)
+            if content
+        ]
+
+    @staticmethod
+    def _build_context(chunks: List[SearchHit], budget: int) -> str:
+        """
+        Joins the content of the retrieved chunks, each followed by its page range.
+        Chunks are packed by relevance within the budget; a chunk that does not fit is left out.
+
+        Args:
+            chunks (List[SearchHit]): The retrieved chunks, most relevant first.
+            budget (int): The number of tokens available for the context.
+
+        Returns:
+            str: The context of the completion.
+        """
+        return "\n\n".join(
+            pack_texts(
+                [
+                    (
+                        f"{chunk.content} page_number {chunk.page_number}"
+                        if chunk.page_end in (None, chunk.page_number)
+                        else f"{chunk.content} page_number {chunk.page_number}-{chunk.page_end}"
+                    )
+                    for chunk in chunks
+                ],
+                budget,
+            )
+        )
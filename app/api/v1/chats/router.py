@@ -6,7 +6,11 @@ It includes endpoints for creating new sessions and asking questions within exis
 from api.v1.chats.controller import ChatController
 from config import Response
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from schemas import (
+    BatchChatCompletion,
+    BatchQuestionRequest,
+    CacheStats,
     ChatCompletion,
     ChatSessionCreate,
     CreateChatSession,
@@ -39,6 +43,20 @@ async def create_session(
     return Response.success(message="Session created successfully.", body=response)
 
 
+@chats_router.get("/cache/stats", response_model=CacheStats)
+async def get_cache_stats():
+    """
+    Endpoint for retrieving the hit and miss counters of the answer and embedding caches.
+
+    Returns:
+        dict: The counters of each cache since startup.
+    """
+    response = ChatController().get_cache_stats()
+    return Response.success(
+        message="Retrieved cache statistics successfully.", body=response
+    )
+
+
 @chats_router.post("/{session_id}", response_model=ChatCompletion)
 async def ask_question(
     session_id: int,
@@ -62,3 +80,57 @@ async def ask_question(
         session=session, question_info=question_data, chat_session_id=session_id
     )
     return Response.success(message="Question answered successfully.", body=response)
+
+
+@chats_router.post("/{session_id}/stream")
+async def ask_question_stream(
+    session_id: int,
+    question_data: QuestionRequest,
+    session: AsyncSession = Depends(get_db_session),
+):
+    """
+    Ask a question within an existing session, streaming the answer as Server-Sent Events.
+
+    Args:
+        session_id (int): The ID of the session to ask the question in.
+        question_data (QuestionRequest): The question data including the question text, max_tokens and model.
+        session (AsyncSession): The database session.
+
+    Returns:
+        StreamingResponse: `delta` events with parts of the answer, then a `done` event with the chat.
+    """
+    if not session_id:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    events = await ChatController().ask_question_stream(
+        session=session, question_info=question_data, chat_session_id=session_id
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@chats_router.post("/{session_id}/batch", response_model=BatchChatCompletion)
+async def ask_questions(
+    session_id: int,
+    questions_data: BatchQuestionRequest,
+    session: AsyncSession = Depends(get_db_session),
+):
+    """
+    Ask many questions within an existing session at once.
+
+    Args:
+        session_id (int): The ID of the session to ask the questions in.
+        questions_data (BatchQuestionRequest): The questions, max_tokens, model and search options.
+        session (AsyncSession): The database session.
+
+    Returns:
+        dict: A success message with the answer to each question.
+    """
+    if not session_id:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    response = await ChatController().ask_questions(
+        session=session, questions_info=questions_data, chat_session_id=session_id
+    )
+    return Response.success(message="Questions answered successfully.", body=response)
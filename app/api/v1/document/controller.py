@@ -3,15 +3,29 @@ This module defines the controller for document management functionality.
 It handles the business logic for retrieving, ingesting, and processing documents.
 """
 
-import hashlib
-from io import BytesIO
+import asyncio
+import os
+import time
 from typing import Any, Dict, List
 
-from crud import DocumentChunkCrud, DocumentCrud
-from fastapi import UploadFile
-from PyPDF2 import PdfReader
+from config import config
+from crud import (
+    DocumentChunkCrud,
+    DocumentCrud,
+    Documents,
+    IngestionJobCrud,
+    IngestionJobs,
+)
+from fastapi import HTTPException, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from utils import logger
+from utils import (
+    chunk_pages,
+    count_pages,
+    iter_text_per_page,
+    logger,
+    spool_upload,
+)
+from utils.session import async_session_factory
 
 
 class DocumentController:
@@ -26,6 +40,7 @@ class DocumentController:
         """
         self.document_crud = DocumentCrud()
         self.document_chunk_crud = DocumentChunkCrud()
+        self.ingestion_job_crud = IngestionJobCrud()
 
     async def get_all_documents(
         self, *, session: AsyncSession, skip: int = 0, limit: int = 10
@@ -53,6 +68,7 @@ class DocumentController:
                     "filename": document.filename,
                     "status": document.status,
                     "embedding_model": document.embedding_model,
+                    "embedding_dimensions": document.embedding_dimensions,
                     "processing_time": document.processing_time,
                     "metadata_info": document.metadata_info,
                     "is_deleted": document.is_deleted,
@@ -62,46 +78,308 @@ class DocumentController:
             )
         return result
 
+    async def get_document_status(
+        self, *, session: AsyncSession, document_id: int
+    ) -> Dict[str, Any]:
+        """
+        Retrieve the ingestion status of a document.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document.
+
+        Returns:
+            Dict[str, Any]: The status, processing time, usage and last error of the ingestion.
+        """
+        logger.info("Inside document controller, executing get_document_status ...")
+        document = await self.document_crud.get(
+            session=session, field=Documents.id, value=document_id
+        )
+        if not document:
+            raise HTTPException(
+                status_code=404, detail=f"Document with ID {document_id} not found"
+            )
+        job = await self.ingestion_job_crud.get(
+            session=session, field=IngestionJobs.document_id, value=document_id
+        )
+        return {
+            "id": document.id,
+            "status": document.status,
+            "processing_time": document.processing_time,
+            "usage": document.metadata_info.get("usage"),
+            "error": job.last_error if job else None,
+        }
+
     async def add_document(
         self, *, session: AsyncSession, file: UploadFile
     ) -> Dict[str, Any]:
         """
-        Ingest a new document, extract its content, and process it into chunks.
+        Store a new document and queue it for ingestion. The content is extracted,
+        embedded and stored into chunks by an ingestion worker. If a document with
+        the same content was already ingested, its chunks are reused instead and
+        the document is completed right away. The spooled upload is removed
+        unless it is queued for ingestion.
 
         Args:
             session (AsyncSession): The database session.
             file (UploadFile): The uploaded PDF file to be ingested.
 
         Returns:
-            Dict[str, Any]: Metadata and processing details of the ingested document.
+            Dict[str, Any]: The ID, status and metadata of the document.
         """
         logger.info("Inside document controller, executing add_document ...")
-        file_content = await file.read()
-        reader = PdfReader(BytesIO(file_content))
-        text_per_page = [page.extract_text() for page in reader.pages]
-        new_document_obj = {
-            "filename": file.filename,
-            "metadata_info": {
-                "size": f"{int(len(file_content) / 1024)} KB",
-                "pages": len(text_per_page),
-                "md5": hashlib.md5(file_content).hexdigest(),
+        path, md5, size = await spool_upload(file=file, directory=config.UPLOAD_DIR)
+        try:
+            original = await self.document_crud.get_by_content_hash(
+                session=session,
+                content_hash=md5,
+                embedding_dimensions=config.EMBEDDING_DIMENSIONS,
+            )
+            if original:
+                page_count = original.metadata_info["pages"]
+            else:
+                page_count = await count_pages(path=path)
+            new_document_obj = {
+                "filename": file.filename,
+                "metadata_info": {
+                    "size": f"{int(size / 1024)} KB",
+                    "pages": page_count,
+                    "md5": md5,
+                },
+            }
+            document_obj = await self.document_crud.create(
+                session=session,
+                create_obj={
+                    **new_document_obj,
+                    "content_hash": md5,
+                    "embedding_dimensions": config.EMBEDDING_DIMENSIONS,
+                },
+            )
+            if not original:
+                _ = await self.ingestion_job_crud.create(
+                    session=session,
+                    create_obj={"document_id": document_obj.id, "file_path": path},
+                )
+        except BaseException:
+            os.remove(path)
+            raise
+        if original:
+            os.remove(path)
+            document_obj = await self._reuse_document_chunks(
+                session=session, document_obj=document_obj, original=original
+            )
+        return {
+            "id": document_obj.id,
+            "status": document_obj.status,
+            **new_document_obj,
+        }
+
+    async def _reuse_document_chunks(
+        self, *, session: AsyncSession, document_obj: Documents, original: Documents
+    ) -> Documents:
+        """
+        Complete a document by copying the chunks and embeddings of an
+        already ingested document with the same content, at no embedding cost.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_obj (Documents): The document to complete.
+            original (Documents): The ingested document with the same content.
+
+        Returns:
+            Documents: The completed document.
+        """
+        logger.info(f"Reusing chunks of document {original.id} for {document_obj.id}")
+        _ = await self.document_chunk_crud.copy_document_chunks(
+            session=session, source_document_id=original.id, document_id=document_obj.id
+        )
+        return await self.document_crud.update(
+            session=session,
+            db_obj=document_obj,
+            obj_in={
+                "processing_time": 0.0,
+                "status": "COMPLETED",
+                "metadata_info": {
+                    **document_obj.metadata_info,
+                    "usage": 0,
+                    "duplicate_of": original.id,
+                },
             },
+        )
+
+    async def process_ingestion_job(
+        self, *, session: AsyncSession, job: IngestionJobs
+    ) -> None:
+        """
+        Extract, embed and store the chunks of a claimed ingestion job. Chunks are
+        committed in checkpoints, so an attempt resumes after the chunks stored by
+        the previous ones, with the chunking settings of the first attempt. A failed
+        attempt is queued again until `INGESTION_MAX_ATTEMPTS` is reached, after
+        which the job and its document are marked FAILED.
+
+        The job belongs to the attempt that claimed it. While it runs, a heartbeat
+        refreshes the job's lock every third of `INGESTION_STALL_TIMEOUT`, so a slow
+        attempt is not requeued. Every update of the job only applies while its
+        attempt number is unchanged: if the job was requeued and claimed again,
+        this attempt is stopped and leaves the job and its document to the new one.
+
+        Args:
+            session (AsyncSession): The database session.
+            job (IngestionJobs): The ingestion job claimed by the worker.
+        """
+        logger.info("Inside document controller, executing process_ingestion_job ...")
+        attempt = job.attempts
+        ingestion = asyncio.create_task(
+            self._ingest(session=session, job=job, attempt=attempt)
+        )
+        keep_alive = asyncio.create_task(
+            self._keep_alive(job_id=job.id, attempt=attempt)
+        )
+        try:
+            await asyncio.wait(
+                {ingestion, keep_alive}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            keep_alive.cancel()
+            if not ingestion.done():
+                ingestion.cancel()
+                await asyncio.gather(ingestion, return_exceptions=True)
+        if ingestion.cancelled():
+            logger.warning(
+                f"Ingestion job {job.id} was claimed again, stopping attempt {attempt}"
+            )
+            await session.rollback()
+            return
+        ingestion.result()
+
+    async def _keep_alive(self, *, job_id: int, attempt: int) -> None:
+        """
+        Refreshes the lock of a job every third of `INGESTION_STALL_TIMEOUT`, in a
+        session of its own, until the job is no longer held by the attempt.
+
+        Args:
+            job_id (int): The ID of the ingestion job.
+            attempt (int): The attempt number the job was claimed with.
+        """
+        while True:
+            await asyncio.sleep(config.INGESTION_STALL_TIMEOUT / 3)
+            try:
+                async with async_session_factory() as session:
+                    if not await self.ingestion_job_crud.heartbeat(
+                        session=session, job_id=job_id, attempt=attempt
+                    ):
+                        return
+            except Exception as exc:
+                logger.error(f"Heartbeat of ingestion job {job_id} failed: {exc!r}")
+
+    async def _ingest(
+        self, *, session: AsyncSession, job: IngestionJobs, attempt: int
+    ) -> None:
+        """
+        Runs one attempt of an ingestion job, see `process_ingestion_job`.
+
+        Args:
+            session (AsyncSession): The database session.
+            job (IngestionJobs): The ingestion job claimed by the worker.
+            attempt (int): The attempt number the job was claimed with.
+        """
+        document_obj = await self.document_crud.get(
+            session=session, field=Documents.id, value=job.document_id
+        )
+        original = await self.document_crud.get_by_content_hash(
+            session=session,
+            content_hash=document_obj.content_hash,
+            embedding_dimensions=document_obj.embedding_dimensions,
+        )
+        if original:
+            if not await self.ingestion_job_crud.update_claimed(
+                session=session,
+                job_id=job.id,
+                attempt=attempt,
+                values={"status": "COMPLETED"},
+            ):
+                await session.rollback()
+                return
+            _ = await self._reuse_document_chunks(
+                session=session, document_obj=document_obj, original=original
+            )
+            os.remove(job.file_path)
+            return
+        chunking = job.metadata_info.get("chunking") or {
+            "chunk_tokens": config.CHUNK_TOKENS,
+            "overlap_tokens": config.CHUNK_OVERLAP_TOKENS,
         }
-        document_obj = await self.document_crud.create(
-            session=session, create_obj=new_document_obj
+        if not await self.ingestion_job_crud.update_claimed(
+            session=session,
+            job_id=job.id,
+            attempt=attempt,
+            values={"metadata_info": {**job.metadata_info, "chunking": chunking}},
+        ):
+            await session.rollback()
+            return
+        document_obj = await self.document_crud.update(
+            session=session, db_obj=document_obj, obj_in={"status": "PROCESSING"}
         )
-        last_chunk = await self.document_chunk_crud.process_document_chunks(
-            session=session, document_id=document_obj.id, chunks=text_per_page
+        self.document_chunk_crud.evict_document(document_id=document_obj.id)
+        start_index, previous_usage = await self.document_chunk_crud.get_progress(
+            session=session, document_id=document_obj.id
         )
-        processing_time_in_seconds = (
-            last_chunk["created_at"] - document_obj.created_at
-        ).total_seconds()
+        if start_index:
+            logger.info(
+                f"Resuming ingestion of document {document_obj.id} at chunk {start_index}"
+            )
+        start = time.monotonic()
+        try:
+            result = await self.document_chunk_crud.process_document_chunks(
+                session=session,
+                document_id=document_obj.id,
+                chunks=chunk_pages(
+                    iter_text_per_page(
+                        path=job.file_path,
+                        page_count=document_obj.metadata_info["pages"],
+                    ),
+                    **chunking,
+                ),
+                dimensions=document_obj.embedding_dimensions,
+                start_index=start_index,
+            )
+        except Exception as exc:
+            logger.error(f"Ingestion of document {document_obj.id} failed: {exc!r}")
+            await session.rollback()
+            await session.refresh(document_obj)
+            status = "PENDING" if attempt < config.INGESTION_MAX_ATTEMPTS else "FAILED"
+            if not await self.ingestion_job_crud.update_claimed(
+                session=session,
+                job_id=job.id,
+                attempt=attempt,
+                values={"status": status, "last_error": str(exc) or repr(exc)},
+            ):
+                await session.rollback()
+                return
+            _ = await self.document_crud.update(
+                session=session, db_obj=document_obj, obj_in={"status": status}
+            )
+            if status == "FAILED":
+                os.remove(job.file_path)
+            return
+        if not await self.ingestion_job_crud.update_claimed(
+            session=session,
+            job_id=job.id,
+            attempt=attempt,
+            values={"status": "COMPLETED"},
+        ):
+            await session.rollback()
+            return
         _ = await self.document_crud.update(
             session=session,
             db_obj=document_obj,
             obj_in={
-                "processing_time": float(processing_time_in_seconds),
+                "processing_time": time.monotonic() - start,
                 "status": "COMPLETED",
+                "metadata_info": {
+                    **document_obj.metadata_info,
+                    "usage": previous_usage + result["usage"],
+                },
             },
         )
-        return {"id": document_obj.id, "usage": last_chunk["usage"], **new_document_obj}
+        os.remove(job.file_path)
@@ -9,7 +9,7 @@ from typing import List, Optional
 from api.v1.document.controller import DocumentController
 from config import Response
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from schemas import DocumentGet, DocumentIngestion
+from schemas import DocumentGet, DocumentIngestion, DocumentStatus
 from sqlalchemy.ext.asyncio import AsyncSession
 from utils import get_db_session
 
@@ -36,7 +36,30 @@ async def get_all_documents(
     )
 
 
-@document_router.post("/ingest", response_model=DocumentIngestion)
+@document_router.get("/{document_id}/status", response_model=DocumentStatus)
+async def get_document_status(
+    document_id: int,
+    session: AsyncSession = Depends(get_db_session),
+):
+    """
+    Endpoint for retrieving the ingestion status of a document.
+
+    Args:
+        document_id (int): The ID of the document.
+        session (AsyncSession): The database session.
+
+    Returns:
+        dict: The ingestion status, processing time, usage and last error of the document.
+    """
+    response = await DocumentController().get_document_status(
+        session=session, document_id=document_id
+    )
+    return Response.success(
+        message="Retrieved document status successfully.", body=response
+    )
+
+
+@document_router.post("/ingest", response_model=DocumentIngestion, status_code=202)
 async def ingest_document(
     new_file: UploadFile = File(
         ..., description="Only PDF file is accepted.", example="paper.pdf"
@@ -44,13 +67,15 @@ async def ingest_document(
     session: AsyncSession = Depends(get_db_session),
 ):
     """
-    Ingest multiple PDF documents, generate embeddings,
-    and store in the vector database.
+    Queue a PDF document for ingestion. An ingestion worker generates the
+    embeddings and stores them in the vector database; progress is reported
+    by the document status endpoint. A document that was already ingested
+    reuses the stored embeddings and is completed immediately.
 
     Args:
         new_file (file): The document content to be ingested.
     Returns:
-        dict: A success message indicating the document was ingested.
+        dict: A success message with the ID and status of the queued document.
     """
     if new_file.content_type != "application/pdf":
         raise HTTPException(
@@ -58,4 +83,10 @@ async def ingest_document(
             detail="Only PDF file is accepted.",
         )
     response = await DocumentController().add_document(session=session, file=new_file)
-    return Response.success(message="Document ingested successfully.", body=response)
+    if response["status"] == "COMPLETED":
+        return Response.success(
+            message="Document ingested successfully.", body=response
+        )
+    return Response.success(
+        message="Document queued for ingestion.", status_code=202, body=response
+    )
@@ -17,6 +17,58 @@ class Config(BaseSettings):
     Attributes:
         SQLALCHEMY_DATABASE_URL (str): The database URL for SQLAlchemy/PostgreSQL.
         OPENAI_API_KEY (str): The API key for OpenAI.
+        EMBEDDING_DIMENSIONS (int): The number of dimensions of the embeddings of newly ingested documents.
+        EMBEDDING_BATCH_MAX_TOKENS (int): The estimated token budget of a single embeddings request.
+        EMBEDDING_BATCH_MAX_ITEMS (int): The maximum number of inputs in a single embeddings request.
+        EMBEDDING_MAX_CONCURRENCY (int): The maximum number of embeddings requests in flight.
+        EMBEDDING_REQUESTS_PER_MINUTE (int): The requests-per-minute quota of the embedding model.
+        EMBEDDING_TOKENS_PER_MINUTE (int): The tokens-per-minute quota of the embedding model.
+        EMBEDDING_MAX_RETRIES (int): The number of retries of an embeddings request after a rate limit, connection or server error.
+        EMBEDDING_CACHE_MAX_MB (int): The memory budget of the in-process embedding cache, in megabytes.
+        EMBEDDING_CACHE_MAX_ROWS (int): The maximum number of embeddings kept in the embedding cache table.
+        EMBEDDING_CACHE_PRUNE_INTERVAL (float): The time in seconds between two checks of the embedding cache table's size by a worker.
+        PDF_POOL_SIZE (int): The number of processes parsing PDF files at the same time.
+        PDF_PAGES_PER_SHARD (int): The number of pages parsed together by one worker task.
+        PDF_PAGE_TIMEOUT (float): The time in seconds allowed for parsing a single page.
+        CHUNK_TOKENS (int): The target number of tokens of a document chunk.
+        CHUNK_OVERLAP_TOKENS (int): The number of tokens shared by consecutive document chunks.
+        INGESTION_BATCH_SIZE (int): The number of chunks embedded and inserted together during ingestion.
+        INGESTION_QUEUE_SIZE (int): The number of batches buffered between ingestion stages.
+        CHUNK_INSERT_BATCH_SIZE (int): The number of chunk rows written and committed together, i.e. the ingestion checkpoint interval.
+        INGESTION_WORKERS (int): The number of ingestion workers started with the API (0 to disable).
+        INGESTION_POLL_INTERVAL (float): The time in seconds an idle worker waits before polling again.
+        INGESTION_MAX_ATTEMPTS (int): The number of attempts before an ingestion job is marked FAILED.
+        INGESTION_STALL_TIMEOUT (float): The time in seconds without a heartbeat after which a PROCESSING job is resumed.
+            A worker sends a heartbeat every third of it.
+        UPLOAD_DIR (str): The directory where uploaded files wait to be ingested. Workers run
+            separately from the API must see the same files, so it must be a shared volume.
+        HNSW_M (int): The maximum number of connections per node of the HNSW index, used when the index is built.
+        HNSW_EF_CONSTRUCTION (int): The candidate list size used when the HNSW index is built.
+        HNSW_EF_SEARCH (int): The candidate list size of an HNSW index scan, set for each similarity search.
+        EMBEDDING_STORAGE (str): The precision of the embeddings searched first: "full", or "half", "int8" or "binary",
+            whose candidates are re-ranked in full precision. "half" and "binary" also apply to database search (pgvector 0.7+).
+        RERANK_CANDIDATES (int): The number of candidates re-ranked in full precision with a compressed EMBEDDING_STORAGE.
+        VECTOR_CACHE_MAX_MB (int): The memory budget of the in-process document embedding matrices, in megabytes (0 to search in the database only).
+        SEARCH_MODE (str): The default retrieval of a question: "vector", "lexical" (full-text) or "hybrid" (both, fused by rank).
+            Only "vector" searches the in-memory matrices and diversifies chunks by maximal marginal relevance.
+        HYBRID_CANDIDATES (int): The number of chunks ranked by each search of a hybrid search before fusion.
+        RRF_K (int): The constant of reciprocal rank fusion; higher values flatten the weight of the top ranks.
+        QUERY_EMBEDDING_TIMEOUT (float): The time in seconds allowed for embedding a question in hybrid mode
+            before falling back to full-text search.
+        BATCH_COMPLETION_CONCURRENCY (int): The maximum number of chat completions in flight for one batch of questions.
+        BATCH_SEARCH_CONCURRENCY (int): The maximum number of questions of one batch searched at once, each in its own session.
+        ANSWER_CACHE_SIMILARITY (float): The minimum cosine similarity between two questions for the answer of one
+            to be reused for the other, within the same document, system message and model (above 1 to disable).
+        RESPONSE_CACHE_MAX_ENTRIES (int): The number of answers kept in the in-process response cache.
+        RESPONSE_CACHE_TTL (float): The time in seconds an answer is reused for identical requests (0 for no expiry).
+        CONTEXT_COMPRESSION_RATIO (float): The share of the retrieved text kept in the context by extractive
+            compression, keeping the sentences most relevant to the question (1 to disable).
+        HISTORY_TURNS (int): The maximum number of previous turns of a session added verbatim to a question (0 to disable history).
+        HISTORY_MAX_TOKENS (int): The maximum number of tokens of the previous turns added verbatim to a question.
+        HISTORY_SUMMARY_TOKENS (int): The maximum number of tokens of the rolling summary of the older turns of a session.
+        HISTORY_SUMMARY_MODEL (str): The chat model that updates the rolling summary of a session.
+        HISTORY_SUMMARY_MAX_CALLS (int): The maximum number of summary updates made for a single question,
+            each folding up to `HISTORY_TURNS` turns into the summary.
     """
 
     SQLALCHEMY_DATABASE_URL: str = cast(str, os.getenv("SQLALCHEMY_DATABASE_URL"))
@@ -24,6 +76,88 @@ class Config(BaseSettings):
     ENV: str = cast(str, os.getenv("ENV", "development"))
     ORIGINS: str = cast(str, os.getenv("ORIGINS", "*"))
     ECHO: bool = cast(bool, os.getenv("ECHO", False))
+    EMBEDDING_DIMENSIONS: int = cast(int, os.getenv("EMBEDDING_DIMENSIONS", 1536))
+    EMBEDDING_BATCH_MAX_TOKENS: int = cast(
+        int, os.getenv("EMBEDDING_BATCH_MAX_TOKENS", 100000)
+    )
+    EMBEDDING_BATCH_MAX_ITEMS: int = cast(
+        int, os.getenv("EMBEDDING_BATCH_MAX_ITEMS", 512)
+    )
+    EMBEDDING_MAX_CONCURRENCY: int = cast(
+        int, os.getenv("EMBEDDING_MAX_CONCURRENCY", 4)
+    )
+    EMBEDDING_REQUESTS_PER_MINUTE: int = cast(
+        int, os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", 3000)
+    )
+    EMBEDDING_TOKENS_PER_MINUTE: int = cast(
+        int, os.getenv("EMBEDDING_TOKENS_PER_MINUTE", 1000000)
+    )
+    EMBEDDING_MAX_RETRIES: int = cast(int, os.getenv("EMBEDDING_MAX_RETRIES", 5))
+    EMBEDDING_CACHE_MAX_MB: int = cast(int, os.getenv("EMBEDDING_CACHE_MAX_MB", 64))
+    EMBEDDING_CACHE_MAX_ROWS: int = cast(
+        int, os.getenv("EMBEDDING_CACHE_MAX_ROWS", 1000000)
+    )
+    EMBEDDING_CACHE_PRUNE_INTERVAL: float = cast(
+        float, os.getenv("EMBEDDING_CACHE_PRUNE_INTERVAL", 3600)
+    )
+    PDF_POOL_SIZE: int = cast(int, os.getenv("PDF_POOL_SIZE", os.cpu_count() or 1))
+    PDF_PAGES_PER_SHARD: int = cast(int, os.getenv("PDF_PAGES_PER_SHARD", 25))
+    PDF_PAGE_TIMEOUT: float = cast(float, os.getenv("PDF_PAGE_TIMEOUT", 10))
+    CHUNK_TOKENS: int = cast(int, os.getenv("CHUNK_TOKENS", 500))
+    CHUNK_OVERLAP_TOKENS: int = cast(int, os.getenv("CHUNK_OVERLAP_TOKENS", 50))
+    INGESTION_BATCH_SIZE: int = cast(int, os.getenv("INGESTION_BATCH_SIZE", 64))
+    INGESTION_QUEUE_SIZE: int = cast(int, os.getenv("INGESTION_QUEUE_SIZE", 4))
+    CHUNK_INSERT_BATCH_SIZE: int = cast(
+        int, os.getenv("CHUNK_INSERT_BATCH_SIZE", 256)
+    )
+    INGESTION_WORKERS: int = cast(int, os.getenv("INGESTION_WORKERS", 2))
+    INGESTION_POLL_INTERVAL: float = cast(
+        float, os.getenv("INGESTION_POLL_INTERVAL", 1)
+    )
+    INGESTION_MAX_ATTEMPTS: int = cast(int, os.getenv("INGESTION_MAX_ATTEMPTS", 3))
+    INGESTION_STALL_TIMEOUT: float = cast(
+        float, os.getenv("INGESTION_STALL_TIMEOUT", 600)
+    )
+    UPLOAD_DIR: str = cast(str, os.getenv("UPLOAD_DIR", "uploads"))
+    HNSW_M: int = cast(int, os.getenv("HNSW_M", 16))
+    HNSW_EF_CONSTRUCTION: int = cast(int, os.getenv("HNSW_EF_CONSTRUCTION", 64))
+    HNSW_EF_SEARCH: int = cast(int, os.getenv("HNSW_EF_SEARCH", 40))
+    EMBEDDING_STORAGE: str = cast(str, os.getenv("EMBEDDING_STORAGE", "full"))
+    RERANK_CANDIDATES: int = cast(int, os.getenv("RERANK_CANDIDATES", 40))
+    VECTOR_CACHE_MAX_MB: int = cast(int, os.getenv("VECTOR_CACHE_MAX_MB", 256))
+    SEARCH_MODE: str = cast(str, os.getenv("SEARCH_MODE", "vector"))
+    HYBRID_CANDIDATES: int = cast(int, os.getenv("HYBRID_CANDIDATES", 20))
+    RRF_K: int = cast(int, os.getenv("RRF_K", 60))
+    QUERY_EMBEDDING_TIMEOUT: float = cast(
+        float, os.getenv("QUERY_EMBEDDING_TIMEOUT", 5)
+    )
+    BATCH_COMPLETION_CONCURRENCY: int = cast(
+        int, os.getenv("BATCH_COMPLETION_CONCURRENCY", 4)
+    )
+    BATCH_SEARCH_CONCURRENCY: int = cast(
+        int, os.getenv("BATCH_SEARCH_CONCURRENCY", 4)
+    )
+    ANSWER_CACHE_SIMILARITY: float = cast(
+        float, os.getenv("ANSWER_CACHE_SIMILARITY", 0.95)
+    )
+    RESPONSE_CACHE_MAX_ENTRIES: int = cast(
+        int, os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 10000)
+    )
+    RESPONSE_CACHE_TTL: float = cast(float, os.getenv("RESPONSE_CACHE_TTL", 3600))
+    CONTEXT_COMPRESSION_RATIO: float = cast(
+        float, os.getenv("CONTEXT_COMPRESSION_RATIO", 1)
+    )
+    HISTORY_TURNS: int = cast(int, os.getenv("HISTORY_TURNS", 3))
+    HISTORY_MAX_TOKENS: int = cast(int, os.getenv("HISTORY_MAX_TOKENS", 1500))
+    HISTORY_SUMMARY_TOKENS: int = cast(
+        int, os.getenv("HISTORY_SUMMARY_TOKENS", 250)
+    )
+    HISTORY_SUMMARY_MODEL: str = cast(
+        str, os.getenv("HISTORY_SUMMARY_MODEL", "gpt-3.5-turbo")
+    )
+    HISTORY_SUMMARY_MAX_CALLS: int = cast(
+        int, os.getenv("HISTORY_SUMMARY_MAX_CALLS", 1)
+    )
     DESCRIPTION: str = (
         "An application that involves backend services and QCA features powered by a Retrieval-Augmented Generation (RAG) system. The application aims to manage users, documents, and an ingestion process that generates embeddings for document retrieval in a Q&A setting."
     )
@@ -1,8 +1,14 @@
 from .chat_sessions import ChatSessionCrud as ChatSessionCrud
 from .chat_sessions import ChatSessions as ChatSessions
+from .chats import CachedAnswer as CachedAnswer
 from .chats import ChatCrud as ChatCrud
 from .chats import Chats as Chats
 from .document_chunks import DocumentChunkCrud as DocumentChunkCrud
 from .document_chunks import DocumentChunks as DocumentChunks
+from .document_chunks import SearchHit as SearchHit
 from .documents import DocumentCrud as DocumentCrud
 from .documents import Documents as Documents
+from .embedding_cache import EmbeddingCache as EmbeddingCache
+from .embedding_cache import EmbeddingCacheCrud as EmbeddingCacheCrud
+from .ingestion_jobs import IngestionJobCrud as IngestionJobCrud
+from .ingestion_jobs import IngestionJobs as IngestionJobs
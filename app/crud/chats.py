@@ -1,22 +1,333 @@
 """
 This module defines the CRUD operations for managing chats.
-It provides functionality to interact with the `Chats` model.
+It provides functionality to interact with the `Chats` model, and to look up
+previous answers in the two answer caches: the response cache, for identical
+requests, and the semantic cache, for similar questions.
+
+The response cache is held in a bounded in-process LRU with a time to live,
+backed by the `response_key` of the chats so it survives restarts.
 """
 
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from config import config
 from models import Chats
 from schemas import ChatCreate
+from sqlalchemy import Row, false, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils import LRUCache, logger
 
 from .base import BaseCrud
 
+response_lru = LRUCache(
+    max_size=config.RESPONSE_CACHE_MAX_ENTRIES, ttl=config.RESPONSE_CACHE_TTL
+)
+
+
+class CachedAnswer(NamedTuple):
+    """
+    A previous answer found in an answer cache.
+
+    Attributes:
+        chat_id (int): The ID of the chat that generated the answer.
+        answer (str): The answer.
+        chat_completion_id (str): The ID of the chat completion that generated the answer.
+    """
+
+    chat_id: int
+    answer: str
+    chat_completion_id: str
+
 
 class ChatCrud(BaseCrud[Chats, ChatCreate, ChatCreate]):
     """
     CRUD class for managing chats.
     Inherits common CRUD operations from BaseCrud.
+
+    Attributes:
+        db_hits (int): The number of responses found in the database since startup.
+        db_misses (int): The number of responses found in neither the LRU nor the database since startup.
+        semantic_hits (int): The number of answers reused for a similar question since startup.
+        semantic_misses (int): The number of questions without a similar enough question since startup.
     """
 
+    db_hits = 0
+    db_misses = 0
+    semantic_hits = 0
+    semantic_misses = 0
+
     def __init__(self):
         """
         Initializes the ChatCrud with the Chats model.
         """
         super().__init__(model=Chats)
+
+    async def create(
+        self, *, session: AsyncSession, create_obj: Dict[str, Any]
+    ) -> Chats:
+        """
+        Creates a chat, adding its answer to the in-process response cache when the chat
+        has a `response_key`.
+
+        Args:
+            session (AsyncSession): The database session.
+            create_obj (Dict[str, Any]): The data of the new chat.
+
+        Returns:
+            Chats: The created chat.
+        """
+        chat_obj = await super().create(session=session, create_obj=create_obj)
+        if chat_obj.response_key:
+            response_lru.put(
+                chat_obj.response_key,
+                CachedAnswer(
+                    chat_obj.id,
+                    chat_obj.answer,
+                    chat_obj.metadata_info["chat_completion_id"],
+                ),
+            )
+        return chat_obj
+
+    async def get_turns(
+        self,
+        *,
+        session: AsyncSession,
+        session_id: int,
+        limit: Optional[int] = None,
+        after_id: int = 0,
+        before_id: Optional[int] = None,
+        oldest: bool = False,
+    ) -> List[Row]:
+        """
+        Retrieves the latest questions and answers of a chat session, optionally within a range of chats.
+        With `oldest`, `limit` keeps the oldest turns of the range instead.
+
+        Args:
+            session (AsyncSession): The database session.
+            session_id (int): The ID of the chat session.
+            limit (Optional[int]): The maximum number of turns (default: no limit).
+            after_id (int): Only turns with a greater chat ID (default: 0).
+            before_id (Optional[int]): Only turns with a smaller chat ID (default: no bound).
+            oldest (bool): Whether the oldest turns are retrieved rather than the latest (default: False).
+
+        Returns:
+            List[Row]: The id, question and answer of each turn, oldest first.
+        """
+        logger.info("Inside chat crud, executing get_turns ...")
+        query = (
+            select(Chats.id, Chats.question, Chats.answer)
+            .where(
+                Chats.session_id == session_id,
+                Chats.id > after_id,
+                Chats.is_deleted.is_(false()),
+            )
+            .order_by(Chats.id if oldest else Chats.id.desc())
+            .limit(limit)
+        )
+        if before_id is not None:
+            query = query.where(Chats.id < before_id)
+        rows = (await session.execute(query)).all()
+        return rows if oldest else rows[::-1]
+
+    @staticmethod
+    def response_cache_key(
+        *,
+        document_id: int,
+        question: str,
+        system_message: Optional[str],
+        model: str,
+        max_tokens: Optional[int],
+        search_options: Dict[str, Any],
+    ) -> str:
+        """
+        Computes the key of a request in the response cache. The whitespace of the
+        question is normalized; every other part must be identical.
+
+        Args:
+            document_id (int): The ID of the document the question is answered from.
+            question (str): The user's question.
+            system_message (Optional[str]): The system message of the chat session.
+            model (str): The chat model.
+            max_tokens (Optional[int]): The maximum number of tokens of the answer.
+            search_options (Dict[str, Any]): The options of the search of the chunks.
+
+        Returns:
+            str: The sha256 hex digest of the request.
+        """
+        request = json.dumps(
+            [
+                document_id,
+                " ".join(question.split()),
+                system_message or "",
+                model,
+                max_tokens,
+                search_options,
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    async def get_cached_response(
+        self, *, session: AsyncSession, response_key: str
+    ) -> Optional[CachedAnswer]:
+        """
+        Finds the answer of an identical request, generated less than `RESPONSE_CACHE_TTL`
+        ago, in the in-process LRU first, then among the chats through the `response_key` index.
+
+        Args:
+            session (AsyncSession): The database session.
+            response_key (str): The key of the request.
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer, or None.
+        """
+        logger.info("Inside chat crud, executing get_cached_response ...")
+        cached = response_lru.get(response_key)
+        if cached is not None:
+            return cached
+        query = (
+            select(
+                Chats.id,
+                Chats.answer,
+                Chats.metadata_info["chat_completion_id"].astext,
+                Chats.created_at,
+            )
+            .where(Chats.response_key == response_key, Chats.is_deleted.is_(false()))
+            .order_by(Chats.id.desc())
+            .limit(1)
+        )
+        if config.RESPONSE_CACHE_TTL:
+            query = query.where(
+                Chats.created_at
+                > datetime.now(timezone.utc)
+                - timedelta(seconds=config.RESPONSE_CACHE_TTL)
+            )
+        row = (await session.execute(query)).first()
+        if row is None:
+            ChatCrud.db_misses += 1
+            return None
+        ChatCrud.db_hits += 1
+        cached = CachedAnswer(*row[:3])
+        ttl = None
+        if config.RESPONSE_CACHE_TTL:
+            # The entry expires from memory when the chat expires from the database.
+            age = (datetime.now(timezone.utc) - row.created_at).total_seconds()
+            ttl = max(config.RESPONSE_CACHE_TTL - age, 1e-3)
+        response_lru.put(response_key, cached, ttl=ttl)
+        return cached
+
+    @staticmethod
+    def answer_cache_key(
+        *, document_id: int, system_message: Optional[str], model: str
+    ) -> str:
+        """
+        Computes the key of an answer's scope in the answer cache. Answers are only
+        reused for questions on the same document, with the same system message and model.
+
+        Args:
+            document_id (int): The ID of the document the question is answered from.
+            system_message (Optional[str]): The system message of the chat session.
+            model (str): The chat model.
+
+        Returns:
+            str: The sha256 hex digest of the scope.
+        """
+        scope = "\x00".join([str(document_id), system_message or "", model])
+        return hashlib.sha256(scope.encode()).hexdigest()
+
+    async def get_cached_answer(
+        self,
+        *,
+        session: AsyncSession,
+        cache_key: str,
+        question_vector: np.ndarray,
+        min_similarity: float,
+    ) -> Optional[CachedAnswer]:
+        """
+        Finds the cached answer of the question most similar to a question, among the
+        chats of the same scope. The scope is looked up through the `cache_key` index,
+        then its questions are ranked by cosine distance.
+
+        Args:
+            session (AsyncSession): The database session.
+            cache_key (str): The key of the answer's scope.
+            question_vector (np.ndarray): The embedding of the question.
+            min_similarity (float): The minimum cosine similarity of the cached question.
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer, or None if no question of the scope
+                is similar enough.
+        """
+        logger.info("Inside chat crud, executing get_cached_answer ...")
+        distance = Chats.question_embedding.cosine_distance(question_vector)
+        result = await session.execute(
+            select(
+                Chats.id,
+                Chats.answer,
+                Chats.metadata_info["chat_completion_id"].astext,
+            )
+            .where(
+                Chats.cache_key == cache_key,
+                Chats.is_deleted.is_(false()),
+                distance <= 1 - min_similarity,
+            )
+            .order_by(distance)
+            .limit(1)
+        )
+        row = result.first()
+        if row is None:
+            ChatCrud.semantic_misses += 1
+            return None
+        ChatCrud.semantic_hits += 1
+        return CachedAnswer(*row)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Returns the hit and miss counters of the answer caches.
+
+        Returns:
+            Dict[str, Any]: The counters of both tiers of the response cache and of the semantic cache.
+        """
+        semantic_lookups = cls.semantic_hits + cls.semantic_misses
+        return {
+            "response": {
+                "memory": response_lru.stats(),
+                "database": {"hits": cls.db_hits, "misses": cls.db_misses},
+            },
+            "semantic": {
+                "hits": cls.semantic_hits,
+                "misses": cls.semantic_misses,
+                "hit_rate": (
+                    cls.semantic_hits / semantic_lookups if semantic_lookups else 0.0
+                ),
+            },
+        }
+
+    async def create_many(
+        self, *, session: AsyncSession, create_objs: List[Dict[str, Any]]
+    ) -> List[Row]:
+        """
+        Creates many chats with a single multi-row insert.
+
+        Args:
+            session (AsyncSession): The database session.
+            create_objs (List[Dict[str, Any]]): The data of each new chat.
+
+        Returns:
+            List[Row]: The id and created_at of each created chat, in input order.
+        """
+        logger.info("Inside chat crud, executing create_many ...")
+        result = await session.execute(
+            insert(Chats).returning(
+                Chats.id, Chats.created_at, sort_by_parameter_order=True
+            ),
+            create_objs,
+        )
+        rows = result.all()
+        await session.commit()
+        return rows
@@ -1,17 +1,116 @@
 """
 This module defines the CRUD operations for managing document chunks.
 It provides functionality to process and store document chunks, as well as perform similarity searches.
+Searches on completed documents are served from an in-process LRU of embedding matrices when
+`VECTOR_CACHE_MAX_MB` is set, and from the database otherwise. Each process has its own LRU,
+so a matrix is checked against its document's `updated_at` before each search, and reloaded
+when another process has since changed the document. Chunks can also be searched
+by full-text search, alone or fused with the similarity search. Searches return `SearchHit`
+objects, loaded by projection, rather than `DocumentChunks` entities.
 """
 
-from typing import Any, Dict, List
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from models import DocumentChunks
+import numpy as np
+from config import config
+from models import DocumentChunks, Documents
+from models.base import utc_now
+from models.document_chunks import TEXT_SEARCH_CONFIG
 from schemas import ChunkCreate
-from sqlalchemy import select
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import (
+    Integer,
+    Text,
+    cast,
+    delete,
+    false,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+    true,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
-from utils import get_vector, logger
+from utils import LRUCache, build_matrix, encode_copy_binary, logger, mmr, top_k
+from utils.session import async_session_factory
 
 from .base import BaseCrud
+from .embedding_cache import EmbeddingCacheCrud
+
+document_matrix_lru = LRUCache(
+    max_size=config.VECTOR_CACHE_MAX_MB * 1024 * 1024,
+    size_of=lambda value: value[0].nbytes + sum(len(row[3]) for row in value[1]),
+)
+
+COPY_COLUMNS = (
+    "document_id",
+    "chunk_index",
+    "content",
+    "embedding",
+    "page_number",
+    "page_end",
+    "metadata_info",
+    "is_deleted",
+    "created_at",
+    "updated_at",
+)
+COPY_COLUMN_TYPES = [
+    "int4",
+    "int4",
+    "text",
+    "vector",
+    "int4",
+    "int4",
+    "jsonb",
+    "bool",
+    "timestamptz",
+    "timestamptz",
+]
+
+
+class SearchHit:
+    """
+    A chunk found by a search, with only the fields needed to build a prompt.
+
+    Attributes:
+        chunk_id (int): The ID of the chunk.
+        page_number (Optional[int]): The page number of the document the chunk starts on.
+        page_end (Optional[int]): The page number of the document the chunk ends on.
+        content (str): The content of the chunk.
+        distance (Optional[float]): The cosine distance between the chunk and the query,
+            or None if the search did not compute it.
+    """
+
+    __slots__ = ("chunk_id", "page_number", "page_end", "content", "distance")
+
+    def __init__(
+        self,
+        chunk_id: int,
+        page_number: Optional[int],
+        page_end: Optional[int],
+        content: str,
+        distance: Optional[float] = None,
+    ):
+        self.chunk_id = chunk_id
+        self.page_number = page_number
+        self.page_end = page_end
+        self.content = content
+        self.distance = distance
+
+    def __repr__(self) -> str:
+        return f"SearchHit(chunk_id={self.chunk_id}, page_number={self.page_number}, distance={self.distance})"
+
+
+HIT_COLUMNS = (
+    DocumentChunks.id,
+    DocumentChunks.page_number,
+    DocumentChunks.page_end,
+    DocumentChunks.content,
+)
 
 
 class DocumentChunkCrud(BaseCrud[DocumentChunks, ChunkCreate, ChunkCreate]):
@@ -25,68 +124,777 @@ class DocumentChunkCrud(BaseCrud[DocumentChunks, ChunkCreate, ChunkCreate]):
         Initializes the DocumentChunkCrud with the DocumentChunks model.
         """
         super().__init__(model=DocumentChunks)
+        self.embedding_cache_crud = EmbeddingCacheCrud()
 
     async def process_document_chunks(
-        self, *, session: AsyncSession, document_id: int, chunks: List[str]
+        self,
+        *,
+        session: AsyncSession,
+        document_id: int,
+        chunks: AsyncIterator[Tuple[int, int, str]],
+        dimensions: int = config.EMBEDDING_DIMENSIONS,
+        start_index: int = 0,
     ) -> Dict[str, Any]:
         """
-        Processes and stores document chunks by generating embeddings for each chunk.
+        Processes and stores document chunks as a pipeline of concurrent stages.
+        Chunks are read lazily, embedded in batches of `INGESTION_BATCH_SIZE`
+        through the embedding cache and written with binary COPY in batches of
+        `CHUNK_INSERT_BATCH_SIZE` rows. Each batch is committed on its own and acts as a checkpoint:
+        a later call with `start_index` set to the number of committed chunks skips them without
+        embedding them again. The stages are connected by a bounded queue of
+        `INGESTION_QUEUE_SIZE` batches, so a slow stage holds the previous ones back.
 
         Args:
             session (AsyncSession): The database session.
             document_id (int): The ID of the document to which the chunks belong.
-            chunks (List[str]): The list of text chunks to process.
+            chunks (AsyncIterator[Tuple[int, int, str]]): The first page, last page and text of each chunk.
+            dimensions (int): The number of dimensions of the embeddings (default: `EMBEDDING_DIMENSIONS`).
+            start_index (int): The index of the first chunk to store (default: 0).
 
         Returns:
-            Dict[str, Any]: A dictionary containing the creation timestamp and total token usage.
+            Dict[str, Any]: A dictionary containing the number of stored chunks and their token usage.
         """
         logger.info("Inside documentchunk crud, executing process_document_chunks ...")
-        total_usage = 0
-        chunk_objs = []
-        for page_number, content in enumerate(chunks, 1):
-            vector, usage = await get_vector(text=content)
-            new_chunk_obj = {
-                "page_number": page_number,
-                "content": content,
-                "document_id": document_id,
-                "embedding": vector,
-                "metadata_info": {"usage": usage},
-            }
-            total_usage += usage
-            chunk_objs.append(DocumentChunks(**new_chunk_obj))
-            if len(chunk_objs) > 10:
-                last_obj = chunk_objs[-1]
-                session.add_all(chunk_objs)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=config.INGESTION_QUEUE_SIZE)
+
+        async def embed_stage() -> None:
+            batch = []
+            chunk_index = 0
+            async for chunk in chunks:
+                chunk_index += 1
+                if chunk_index <= start_index:
+                    continue
+                batch.append((chunk_index - 1, *chunk))
+                if len(batch) >= config.INGESTION_BATCH_SIZE:
+                    await queue.put(_start_embedding(batch))
+                    batch = []
+            if batch:
+                await queue.put(_start_embedding(batch))
+            await queue.put(None)
+
+        async def embed(texts: List[str]) -> List[Tuple[Any, int]]:
+            async with async_session_factory() as cache_session:
+                return await self.embedding_cache_crud.get_vectors(
+                    session=cache_session, texts=texts, dimensions=dimensions
+                )
+
+        def _start_embedding(
+            batch: List[Tuple[int, int, int, str]],
+        ) -> Tuple[list, asyncio.Future]:
+            texts = [content for _, _, _, content in batch]
+            return batch, asyncio.ensure_future(embed(texts))
+
+        async def insert_stage() -> Dict[str, Any]:
+            total_usage, total_chunks = 0, 0
+            rows: List[Tuple[int, int, int, str, Any, int]] = []
+
+            async def checkpoint() -> None:
+                nonlocal total_chunks, rows
+                total_chunks += await self.bulk_insert_chunks(
+                    session=session, document_id=document_id, rows=rows
+                )
                 await session.commit()
-                chunk_objs = []
-        if chunk_objs:
-            last_obj = chunk_objs[-1]
-            session.add_all(chunk_objs)
-            await session.commit()
-        return {"created_at": last_obj.created_at, "usage": total_usage}
+                rows = []
+
+            while (item := await queue.get()) is not None:
+                batch, embedding_task = item
+                for chunk, (vector, usage) in zip(batch, await embedding_task):
+                    rows.append((*chunk, vector, usage))
+                    total_usage += usage
+                if len(rows) >= config.CHUNK_INSERT_BATCH_SIZE:
+                    await checkpoint()
+            if rows:
+                await checkpoint()
+            return {"chunks": total_chunks, "usage": total_usage}
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                task_group.create_task(embed_stage())
+                inserted = task_group.create_task(insert_stage())
+        except ExceptionGroup as exc_group:
+            raise exc_group.exceptions[0]
+        finally:
+            while not queue.empty():
+                if item := queue.get_nowait():
+                    item[1].cancel()
+        return inserted.result()
+
+    async def bulk_insert_chunks(
+        self,
+        *,
+        session: AsyncSession,
+        document_id: int,
+        rows: List[Tuple[int, int, int, str, Any, int]],
+    ) -> int:
+        """
+        Writes chunk rows with a single binary COPY, bypassing the ORM. Embeddings
+        are sent as binary float32 vectors instead of text. The rows are not
+        committed, so several calls can share the transaction of the caller.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document to which the chunks belong.
+            rows (List[Tuple[int, int, int, str, Any, int]]): The index, first page, last page, content,
+                embedding and token usage of each chunk.
+
+        Returns:
+            int: The number of inserted chunks.
+        """
+        logger.info("Inside documentchunk crud, executing bulk_insert_chunks ...")
+        now = utc_now()
+        payload = encode_copy_binary(
+            (
+                (document_id, chunk_index, content, vector, page_number, page_end)
+                + ({"usage": usage}, False, now, now)
+                for chunk_index, page_number, page_end, content, vector, usage in rows
+            ),
+            COPY_COLUMN_TYPES,
+        )
+        connection = await session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        await driver_connection.copy_to_table(
+            DocumentChunks.__tablename__,
+            source=memoryview(payload),
+            columns=list(COPY_COLUMNS),
+            format="binary",
+        )
+        return len(rows)
+
+    async def copy_document_chunks(
+        self, *, session: AsyncSession, source_document_id: int, document_id: int
+    ) -> int:
+        """
+        Copies the chunks and embeddings of a document to another document
+        inside the database, without generating any embedding.
+
+        Args:
+            session (AsyncSession): The database session.
+            source_document_id (int): The ID of the document whose chunks are copied.
+            document_id (int): The ID of the document receiving the copies.
+
+        Returns:
+            int: The number of copied chunks.
+        """
+        logger.info("Inside documentchunk crud, executing copy_document_chunks ...")
+        now = utc_now()
+        columns = [
+            "document_id",
+            "chunk_index",
+            "content",
+            "embedding",
+            "page_number",
+            "page_end",
+        ]
+        query = insert(DocumentChunks).from_select(
+            [*columns, "metadata_info", "is_deleted", "created_at", "updated_at"],
+            select(
+                literal(document_id),
+                *(getattr(DocumentChunks, column) for column in columns[1:]),
+                func.jsonb_build_object(
+                    "usage", 0, "source_chunk_id", DocumentChunks.id
+                ),
+                false(),
+                literal(now),
+                literal(now),
+            )
+            .where(
+                DocumentChunks.document_id == source_document_id,
+                DocumentChunks.is_deleted.is_(false()),
+            )
+            .order_by(DocumentChunks.id),
+        )
+        result = await session.execute(query)
+        await session.commit()
+        return result.rowcount
+
+    async def get_progress(
+        self, *, session: AsyncSession, document_id: int
+    ) -> Tuple[int, int]:
+        """
+        Returns how far the ingestion of a document got, based on its committed chunks.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document.
+
+        Returns:
+            int: The index of the next chunk to store.
+            int: The token usage of the stored chunks.
+        """
+        logger.info("Inside documentchunk crud, executing get_progress ...")
+        next_index, usage = (
+            await session.execute(
+                select(
+                    func.coalesce(func.max(DocumentChunks.chunk_index) + 1, 0),
+                    func.coalesce(
+                        func.sum(DocumentChunks.metadata_info["usage"].astext.cast(Integer)),
+                        0,
+                    ),
+                ).where(DocumentChunks.document_id == document_id)
+            )
+        ).one()
+        return next_index, usage
+
+    async def delete_document_chunks(
+        self, *, session: AsyncSession, document_id: int
+    ) -> None:
+        """
+        Permanently deletes all chunks of a document, such as those left behind
+        by a failed ingestion attempt.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document whose chunks are deleted.
+        """
+        logger.info("Inside documentchunk crud, executing delete_document_chunks ...")
+        await session.execute(
+            delete(DocumentChunks).where(DocumentChunks.document_id == document_id)
+        )
+        await session.commit()
+        self.evict_document(document_id=document_id)
+
+    def evict_document(self, *, document_id: int) -> None:
+        """
+        Drops the in-memory embedding matrix of a document, so the next search
+        reloads its chunks.
+
+        Args:
+            document_id (int): The ID of the document.
+        """
+        document_matrix_lru.invalidate(document_id)
+
+    async def _get_document_matrix(
+        self, *, session: AsyncSession, document_id: int
+    ) -> Tuple[Any, List[Tuple[Any, ...]]] | None:
+        """
+        Returns the in-memory embedding matrix of a completed document. The LRU is local
+        to the process, while documents are re-ingested or deleted by any process, so a
+        cached matrix is only used if its document was not updated since it was loaded;
+        otherwise it is reloaded. Documents that are deleted or still being ingested are
+        not loaded, as their chunks may change.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document.
+
+        Returns:
+            Tuple[Any, List[Tuple[Any, ...]]] | None: The matrix and the `SearchHit` fields of
+                the chunk of each row, or None if the document is not completed or has no chunks.
+        """
+        document = (
+            await session.execute(
+                select(Documents.status, Documents.updated_at).where(
+                    Documents.id == document_id, Documents.is_deleted.is_(false())
+                )
+            )
+        ).one_or_none()
+        if not document or document.status != "COMPLETED":
+            self.evict_document(document_id=document_id)
+            return None
+        entry = document_matrix_lru.get(document_id)
+        if entry and entry[2] == document.updated_at:
+            return entry[:2]
+        return await self._load_document_matrix(
+            session=session, document_id=document_id, version=document.updated_at
+        )
+
+    async def _load_document_matrix(
+        self, *, session: AsyncSession, document_id: int, version: datetime
+    ) -> Tuple[Any, List[Tuple[Any, ...]]] | None:
+        """
+        Loads the embeddings of a completed document into a normalized matrix, and caches it
+        with the version of the document it was loaded from.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document.
+            version (datetime): The `updated_at` of the document when it was found completed.
+
+        Returns:
+            Tuple[Any, List[Tuple[Any, ...]]] | None: The matrix and the `SearchHit` fields of
+                the chunk of each row, or None if the document has no chunks.
+        """
+        rows = (
+            await session.execute(
+                select(*HIT_COLUMNS, DocumentChunks.embedding)
+                .where(
+                    DocumentChunks.document_id == document_id,
+                    DocumentChunks.is_deleted.is_(false()),
+                    DocumentChunks.embedding.is_not(None),
+                )
+                .order_by(DocumentChunks.chunk_index)
+            )
+        ).all()
+        if not rows:
+            return None
+        entry = (
+            build_matrix([row.embedding for row in rows], config.EMBEDDING_STORAGE),
+            [tuple(row[: len(HIT_COLUMNS)]) for row in rows],
+        )
+        document_matrix_lru.put(document_id, (*entry, version))
+        return entry
 
     async def similarity_search(
         self,
         *,
         session: AsyncSession,
         document_id: int,
-        search_query_vector: List[float]
-    ) -> List[Any]:
+        search_query_vector: List[float],
+        k: int = 3,
+        fetch_k: int = 20,
+        mmr_lambda: float = 1.0,
+    ) -> List[SearchHit]:
         """
         Performs a similarity search on document chunks using a query vector.
+        When `VECTOR_CACHE_MAX_MB` is set, completed documents are searched in memory:
+        their embeddings are loaded into a normalized matrix, reloaded only when the
+        document is updated, and the closest
+        chunks come from a single matrix-vector product. Otherwise the database is
+        searched through the partial HNSW index of the query's dimension, with the
+        index scan tuned by `HNSW_EF_SEARCH` for the current transaction only.
+        Only the fields of `SearchHit` are loaded, and embeddings only when the
+        results are diversified.
+
+        With a compressed `EMBEDDING_STORAGE`, both paths first select
+        `RERANK_CANDIDATES` chunks on the compressed embeddings, then re-rank
+        them by exact cosine distance.
+
+        The `fetch_k` most similar chunks are then diversified by maximal marginal
+        relevance down to `k` chunks, unless `mmr_lambda` is 1.
 
         Args:
             session (AsyncSession): The database session.
             document_id (int): The ID of the document to search within.
             search_query_vector (List[float]): The query vector for similarity search.
+            k (int): The number of chunks to return (default: 3).
+            fetch_k (int): The number of most similar chunks the `k` chunks are selected from (default: 20).
+            mmr_lambda (float): The weight of relevance against diversity, between 0 and 1 (default: 1, relevance only).
 
         Returns:
-            List[Any]: A list of the most similar document chunks.
+            List[SearchHit]: The most similar chunks, with their cosine distance to the query.
         """
         logger.info("Inside documentchunk crud, executing similarity_search ...")
-        return await session.scalars(
-            select(DocumentChunks)
-            .where(DocumentChunks.document_id == document_id)
-            .order_by(DocumentChunks.embedding.cosine_distance(search_query_vector))
-            .limit(3)
+        diversify = mmr_lambda < 1 and fetch_k > k
+        fetch_k = fetch_k if diversify else k
+        if config.VECTOR_CACHE_MAX_MB:
+            entry = await self._get_document_matrix(
+                session=session, document_id=document_id
+            )
+            if entry:
+                matrix, rows = entry
+                if matrix.dtype == np.float32:
+                    indices, scores = top_k(matrix, search_query_vector, fetch_k)
+                    candidates, candidate_matrix = (
+                        [
+                            SearchHit(*rows[index], float(1 - score))
+                            for index, score in zip(indices, scores)
+                        ],
+                        matrix[indices],
+                    )
+                else:
+                    indices, _ = top_k(
+                        matrix,
+                        search_query_vector,
+                        max(config.RERANK_CANDIDATES, fetch_k),
+                    )
+                    candidates, candidate_matrix = await self._rerank(
+                        session=session,
+                        document_id=document_id,
+                        candidates=[SearchHit(*rows[index]) for index in indices],
+                        search_query_vector=search_query_vector,
+                        limit=fetch_k,
+                    )
+                if not diversify:
+                    return candidates
+                return self._diversify(
+                    candidates=candidates,
+                    matrix=candidate_matrix,
+                    search_query_vector=search_query_vector,
+                    k=k,
+                    mmr_lambda=mmr_lambda,
+                )
+        await self._set_ef_search(session=session)
+        dimensions = len(search_query_vector)
+        conditions = self._embedding_conditions(document_id, dimensions)
+        distance = cast(DocumentChunks.embedding, Vector(dimensions)).cosine_distance(
+            search_query_vector
+        )
+        columns = [*HIT_COLUMNS, distance.label("distance")]
+        if diversify:
+            columns.append(DocumentChunks.embedding)
+        query = select(*columns).where(*conditions)
+        coarse_distance = self._coarse_distance(search_query_vector)
+        if coarse_distance is not None:
+            query = query.where(
+                DocumentChunks.id.in_(
+                    select(DocumentChunks.id)
+                    .where(*conditions)
+                    .order_by(coarse_distance)
+                    .limit(max(config.RERANK_CANDIDATES, fetch_k))
+                )
+            )
+        rows = (await session.execute(query.order_by(distance).limit(fetch_k))).all()
+        candidates = [SearchHit(*row[:5]) for row in rows]
+        if not diversify or not candidates:
+            return candidates
+        return self._diversify(
+            candidates=candidates,
+            matrix=build_matrix([row.embedding for row in rows]),
+            search_query_vector=search_query_vector,
+            k=k,
+            mmr_lambda=mmr_lambda,
         )
+
+    async def batch_similarity_search(
+        self,
+        *,
+        session: AsyncSession,
+        document_id: int,
+        search_query_vectors: List[List[float]],
+        k: int = 3,
+    ) -> List[List[SearchHit]]:
+        """
+        Performs a similarity search for many query vectors at once. Completed
+        documents with a full-precision matrix in memory are searched without
+        querying the database. Otherwise the query vectors are unnested in a
+        single statement, and a LATERAL subquery runs the index scan of each one.
+        With quantized `EMBEDDING_STORAGE` there is no full-precision index to
+        scan, so each query is searched and re-ranked on its own.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document to search within.
+            search_query_vectors (List[List[float]]): The query vectors, all of the same dimension.
+            k (int): The number of chunks to return per query (default: 3).
+
+        Returns:
+            List[List[SearchHit]]: The most similar chunks of each query, in input order.
+        """
+        logger.info("Inside documentchunk crud, executing batch_similarity_search ...")
+        if config.VECTOR_CACHE_MAX_MB:
+            entry = await self._get_document_matrix(
+                session=session, document_id=document_id
+            )
+            if entry and entry[0].dtype == np.float32:
+                matrix, rows = entry
+                results = []
+                for search_query_vector in search_query_vectors:
+                    indices, scores = top_k(matrix, search_query_vector, k)
+                    results.append(
+                        [
+                            SearchHit(*rows[index], float(1 - score))
+                            for index, score in zip(indices, scores)
+                        ]
+                    )
+                return results
+        if self._coarse_distance(search_query_vectors[0]) is not None:
+            return [
+                await self.similarity_search(
+                    session=session,
+                    document_id=document_id,
+                    search_query_vector=search_query_vector,
+                    k=k,
+                )
+                for search_query_vector in search_query_vectors
+            ]
+        await self._set_ef_search(session=session)
+        dimensions = len(search_query_vectors[0])
+        queries = (
+            func.unnest(
+                cast(
+                    [
+                        f"[{','.join(map(str, vector))}]"
+                        for vector in search_query_vectors
+                    ],
+                    ARRAY(Text),
+                )
+            )
+            .table_valued("vector", with_ordinality="position")
+            .render_derived(name="queries")
+        )
+        distance = cast(DocumentChunks.embedding, Vector(dimensions)).cosine_distance(
+            cast(queries.c.vector, Vector(dimensions))
+        )
+        hits = (
+            select(*HIT_COLUMNS, distance.label("distance"))
+            .where(*self._embedding_conditions(document_id, dimensions))
+            .order_by(distance)
+            .limit(k)
+            .lateral("hits")
+        )
+        rows = await session.execute(
+            select(queries.c.position, hits)
+            .select_from(queries)
+            .join(hits, true())
+            .order_by(queries.c.position, hits.c.distance)
+        )
+        results = [[] for _ in search_query_vectors]
+        for position, *hit in rows:
+            results[position - 1].append(SearchHit(*hit))
+        return results
+
+    async def lexical_search(
+        self, *, session: AsyncSession, document_id: int, query: str, limit: int = 3
+    ) -> List[SearchHit]:
+        """
+        Performs a full-text search on document chunks through their GIN index.
+        The query is parsed like a web search: quoted phrases, `or` and `-` are supported.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document to search within.
+            query (str): The text to search for.
+            limit (int): The number of chunks to return (default: 3).
+
+        Returns:
+            List[SearchHit]: The matching chunks, best ranked first, without distance.
+        """
+        logger.info("Inside documentchunk crud, executing lexical_search ...")
+        ts_query = self._ts_query(query)
+        rank = func.ts_rank_cd(DocumentChunks.search_vector, ts_query)
+        rows = (
+            await session.execute(
+                select(*HIT_COLUMNS)
+                .where(
+                    DocumentChunks.document_id == document_id,
+                    DocumentChunks.search_vector.bool_op("@@")(ts_query),
+                )
+                .order_by(rank.desc(), DocumentChunks.chunk_index)
+                .limit(limit)
+            )
+        ).all()
+        return [SearchHit(*row) for row in rows]
+
+    async def hybrid_search(
+        self,
+        *,
+        session: AsyncSession,
+        document_id: int,
+        query: str,
+        search_query_vector: List[float],
+        limit: int = 3,
+    ) -> List[SearchHit]:
+        """
+        Performs a similarity search and a full-text search in a single statement and
+        fuses their results by reciprocal rank: each search ranks its best
+        `HYBRID_CANDIDATES` chunks, and a chunk scores 1 / (`RRF_K` + rank) in each
+        search that found it. With a compressed `EMBEDDING_STORAGE`, the similarity search
+        selects its chunks through the quantized index and ranks them by exact cosine distance.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document to search within.
+            query (str): The text to search for.
+            search_query_vector (List[float]): The query vector for similarity search.
+            limit (int): The number of chunks to return (default: 3).
+
+        Returns:
+            List[SearchHit]: The chunks with the highest fused score, best first,
+                with their cosine distance to the query.
+        """
+        logger.info("Inside documentchunk crud, executing hybrid_search ...")
+        await self._set_ef_search(session=session)
+        dimensions = len(search_query_vector)
+        distance = cast(DocumentChunks.embedding, Vector(dimensions)).cosine_distance(
+            search_query_vector
+        )
+        coarse_distance = self._coarse_distance(search_query_vector)
+        nearest = (
+            select(DocumentChunks.id, distance.label("distance"))
+            .where(*self._embedding_conditions(document_id, dimensions))
+            .order_by(distance if coarse_distance is None else coarse_distance)
+            .limit(config.HYBRID_CANDIDATES)
+            .subquery()
+        )
+        ts_query = self._ts_query(query)
+        rank = func.ts_rank_cd(DocumentChunks.search_vector, ts_query)
+        matching = (
+            select(DocumentChunks.id, rank.label("rank"))
+            .where(
+                DocumentChunks.document_id == document_id,
+                DocumentChunks.search_vector.bool_op("@@")(ts_query),
+            )
+            .order_by(rank.desc(), DocumentChunks.chunk_index)
+            .limit(config.HYBRID_CANDIDATES)
+            .subquery()
+        )
+        vector_ranks = select(
+            nearest.c.id,
+            func.row_number().over(order_by=nearest.c.distance).label("position"),
+        ).subquery()
+        lexical_ranks = select(
+            matching.c.id,
+            func.row_number().over(order_by=matching.c.rank.desc()).label("position"),
+        ).subquery()
+        fused = (
+            select(
+                func.coalesce(vector_ranks.c.id, lexical_ranks.c.id).label("id"),
+                (
+                    func.coalesce(1.0 / (config.RRF_K + vector_ranks.c.position), 0)
+                    + func.coalesce(1.0 / (config.RRF_K + lexical_ranks.c.position), 0)
+                ).label("score"),
+            )
+            .select_from(
+                vector_ranks.join(
+                    lexical_ranks, vector_ranks.c.id == lexical_ranks.c.id, full=True
+                )
+            )
+            .subquery()
+        )
+        rows = (
+            await session.execute(
+                select(*HIT_COLUMNS, distance)
+                .join(fused, DocumentChunks.id == fused.c.id)
+                .where(DocumentChunks.document_id == document_id)
+                .order_by(fused.c.score.desc(), DocumentChunks.chunk_index)
+                .limit(limit)
+            )
+        ).all()
+        return [SearchHit(*row) for row in rows]
+
+    @staticmethod
+    async def _set_ef_search(*, session: AsyncSession) -> None:
+        """
+        Sets the candidate list size of HNSW index scans to `HNSW_EF_SEARCH`
+        for the current transaction.
+
+        Args:
+            session (AsyncSession): The database session.
+        """
+        await session.execute(
+            select(
+                func.set_config("hnsw.ef_search", str(config.HNSW_EF_SEARCH), True)
+            )
+        )
+
+    @staticmethod
+    def _embedding_conditions(document_id: int, dimensions: int) -> Tuple[Any, ...]:
+        """
+        Builds the conditions selecting the embeddings of a document with the
+        given dimensions, which match the partial HNSW index of that dimension.
+
+        Args:
+            document_id (int): The ID of the document.
+            dimensions (int): The number of dimensions of the query vector.
+
+        Returns:
+            Tuple[Any, ...]: The conditions of the search.
+        """
+        return (
+            DocumentChunks.document_id == document_id,
+            func.vector_dims(DocumentChunks.embedding)
+            == literal_column(str(dimensions)),
+        )
+
+    @staticmethod
+    def _ts_query(query: str) -> Any:
+        """
+        Parses a full-text query with the configuration of the search vectors.
+
+        Args:
+            query (str): The text to search for.
+
+        Returns:
+            Any: The `tsquery` expression.
+        """
+        return func.websearch_to_tsquery(
+            literal_column(f"'{TEXT_SEARCH_CONFIG}'"), query
+        )
+
+    @staticmethod
+    def _coarse_distance(search_query_vector: List[float]) -> Any:
+        """
+        Builds the distance of the quantized HNSW index of `EMBEDDING_STORAGE`,
+        which needs pgvector 0.7 or later. The quantized index replaces the
+        full-precision one, so its candidates are re-ranked from the embeddings
+        of the table. pgvector has no int8 vector type, so int8 storage only
+        applies to in-memory search.
+
+        Args:
+            search_query_vector (List[float]): The query vector for similarity search.
+
+        Returns:
+            Any: The distance expression, or None if the embeddings are searched in full precision.
+        """
+        dimensions = len(search_query_vector)
+        if config.EMBEDDING_STORAGE == "half":
+            return cast(DocumentChunks.embedding, HALFVEC(dimensions)).cosine_distance(
+                search_query_vector
+            )
+        if config.EMBEDDING_STORAGE == "binary":
+            return cast(
+                func.binary_quantize(DocumentChunks.embedding), BIT(dimensions)
+            ).hamming_distance(
+                func.binary_quantize(cast(search_query_vector, Vector(dimensions)))
+            )
+        return None
+
+    async def _rerank(
+        self,
+        *,
+        session: AsyncSession,
+        document_id: int,
+        candidates: List[SearchHit],
+        search_query_vector: List[float],
+        limit: int,
+    ) -> Tuple[List[SearchHit], np.ndarray]:
+        """
+        Re-ranks candidate chunks by exact cosine similarity, using their
+        full-precision embeddings from the database.
+
+        Args:
+            session (AsyncSession): The database session.
+            document_id (int): The ID of the document of the candidates.
+            candidates (List[SearchHit]): The candidate chunks.
+            search_query_vector (List[float]): The query vector for similarity search.
+            limit (int): The number of chunks to return.
+
+        Returns:
+            List[SearchHit]: The most similar candidates, most similar first, with their distance.
+            np.ndarray: The normalized full-precision embedding of each returned candidate.
+        """
+        embeddings = dict(
+            (
+                await session.execute(
+                    select(DocumentChunks.id, DocumentChunks.embedding).where(
+                        DocumentChunks.document_id == document_id,
+                        DocumentChunks.id.in_([hit.chunk_id for hit in candidates]),
+                    )
+                )
+            ).all()
+        )
+        candidates = [hit for hit in candidates if hit.chunk_id in embeddings]
+        if not candidates:
+            return [], np.empty((0, len(search_query_vector)), dtype=np.float32)
+        matrix = build_matrix([embeddings[hit.chunk_id] for hit in candidates])
+        indices, scores = top_k(matrix, search_query_vector, limit)
+        for index, score in zip(indices, scores):
+            candidates[index].distance = float(1 - score)
+        return [candidates[index] for index in indices], matrix[indices]
+
+    @staticmethod
+    def _diversify(
+        *,
+        candidates: List[SearchHit],
+        matrix: np.ndarray,
+        search_query_vector: List[float],
+        k: int,
+        mmr_lambda: float,
+    ) -> List[SearchHit]:
+        """
+        Selects `k` of the candidate chunks by maximal marginal relevance.
+
+        Args:
+            candidates (List[SearchHit]): The candidate chunks, most similar first.
+            matrix (np.ndarray): The normalized float32 embedding of each candidate.
+            search_query_vector (List[float]): The query vector for similarity search.
+            k (int): The number of chunks to return.
+            mmr_lambda (float): The weight of relevance against diversity, 1 to keep the most similar chunks.
+
+        Returns:
+            List[SearchHit]: The selected chunks, in selection order.
+        """
+        if mmr_lambda >= 1 or len(candidates) <= k:
+            return candidates[:k]
+        indices = mmr(matrix, search_query_vector, k, mmr_lambda)
+        return [candidates[index] for index in indices]
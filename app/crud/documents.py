@@ -5,6 +5,8 @@ It provides functionality to interact with the `Documents` model.
 
 from models import Documents
 from schemas import DocumentCreate, DocumentUpdate
+from sqlalchemy import false, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils import logger
 
 from .base import BaseCrud
@@ -13,7 +15,7 @@ from .base import BaseCrud
 class DocumentCrud(BaseCrud[Documents, DocumentUpdate, DocumentCreate]):
     """
     CRUD class for managing documents.
-    Inherits common CRUD operations from BaseCrud.
+    Inherits common CRUD operations from BaseCrud and provides a lookup by content hash.
     """
 
     def __init__(self):
@@ -21,3 +23,40 @@ class DocumentCrud(BaseCrud[Documents, DocumentUpdate, DocumentCreate]):
         Initializes the DocumentCrud with the Documents model.
         """
         super().__init__(model=Documents)
+
+    async def get_by_content_hash(
+        self,
+        *,
+        session: AsyncSession,
+        content_hash: str,
+        embedding_model: str = "text-embedding-3-small",
+        embedding_dimensions: int = 1536,
+    ) -> Documents | None:
+        """
+        Retrieve the oldest completed document with the given content hash
+        that was embedded with the given model and number of dimensions.
+
+        Args:
+            session (AsyncSession): The database session.
+            content_hash (str): The md5 hex digest of the file content.
+            embedding_model (str): The embedding model of the document (default: "text-embedding-3-small").
+            embedding_dimensions (int): The number of dimensions of the document's embeddings (default: 1536).
+
+        Returns:
+            Documents | None: The matching document, or None if the content is new.
+        """
+        logger.info("Inside document crud, executing get_by_content_hash ...")
+        query = (
+            select(Documents)
+            .where(
+                Documents.content_hash == content_hash,
+                Documents.embedding_model == embedding_model,
+                Documents.embedding_dimensions == embedding_dimensions,
+                Documents.status == "COMPLETED",
+                Documents.is_deleted.is_(false()),
+            )
+            .order_by(Documents.id)
+            .limit(1)
+        )
+        result = await session.execute(query)
+        return result.scalars().first()
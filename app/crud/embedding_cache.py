@@ -0,0 +1,248 @@
+"""
+This module defines the CRUD operations for the embedding cache.
+Embeddings are looked up in a bounded in-process LRU first, then in the
+`embedding_cache` table, and only the remaining texts are sent to the embedding API.
+Entries found in the table are marked as used, and the table is pruned of its least
+recently used entries once it outgrows `EMBEDDING_CACHE_MAX_ROWS`.
+"""
+
+import asyncio
+import hashlib
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from config import config
+from models import EmbeddingCache
+from models.base import utc_now
+from schemas import EmbeddingCacheCreate
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils import EMBEDDING_MODEL, LRUCache, get_vectors, logger
+
+from .base import BaseCrud
+
+embedding_lru = LRUCache(
+    max_size=config.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+    size_of=lambda value: value[0].nbytes,
+)
+LAST_USED_RESOLUTION = timedelta(hours=1)
+
+
+class EmbeddingCacheCrud(
+    BaseCrud[EmbeddingCache, EmbeddingCacheCreate, EmbeddingCacheCreate]
+):
+    """
+    CRUD class for the embedding cache.
+    Provides cached replacements for `get_vector` and `get_vectors`.
+
+    Attributes:
+        db_hits (int): The number of embeddings found in the database since startup.
+        db_misses (int): The number of embeddings generated since startup.
+    """
+
+    db_hits = 0
+    db_misses = 0
+
+    def __init__(self):
+        """
+        Initializes the EmbeddingCacheCrud with the EmbeddingCache model.
+        """
+        super().__init__(model=EmbeddingCache)
+
+    @staticmethod
+    def _text_hash(text: str) -> str:
+        """
+        Computes the cache key of a text.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            str: The sha256 hex digest of the text.
+        """
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    async def get_vectors(
+        self,
+        *,
+        session: AsyncSession,
+        texts: List[str],
+        dimensions: int = config.EMBEDDING_DIMENSIONS,
+        timeout: Optional[float] = None,
+    ) -> List[Tuple[np.ndarray, int]]:
+        """
+        Returns the embeddings of many texts, generating only those that are in
+        neither the in-process LRU nor the database. Cached embeddings report a
+        token usage of 0 since they cost nothing. Entries found in the database
+        have their `last_used_at` refreshed, at most once per `LAST_USED_RESOLUTION`
+        so frequent lookups do not rewrite their rows.
+
+        Args:
+            session (AsyncSession): The database session.
+            texts (List[str]): The texts to embed.
+            dimensions (int): The number of dimensions of the embeddings (default: `EMBEDDING_DIMENSIONS`).
+            timeout (Optional[float]): The time in seconds allowed for generating the embeddings, including
+                the wait for the embedding scheduler and retries (default: the client's timeout per request).
+
+        Returns:
+            List[Tuple[np.ndarray, int]]: The embedding vector and token usage of each text, in input order.
+
+        Raises:
+            asyncio.TimeoutError: If the embeddings are not generated within `timeout`.
+        """
+        logger.info("Inside embeddingcache crud, executing get_vectors ...")
+        hashes = [self._text_hash(text) for text in texts]
+        found: Dict[str, Tuple[np.ndarray, int]] = {}
+        for text_hash in set(hashes):
+            cached = embedding_lru.get((EMBEDDING_MODEL, dimensions, text_hash))
+            if cached is not None:
+                found[text_hash] = (cached[0], 0)
+        stale_ids = []
+        if missing := {text_hash for text_hash in hashes if text_hash not in found}:
+            rows = await session.execute(
+                select(
+                    EmbeddingCache.id,
+                    EmbeddingCache.text_hash,
+                    EmbeddingCache.embedding,
+                    EmbeddingCache.last_used_at,
+                ).where(
+                    EmbeddingCache.model == EMBEDDING_MODEL,
+                    EmbeddingCache.dimensions == dimensions,
+                    EmbeddingCache.text_hash.in_(missing),
+                )
+            )
+            for row_id, text_hash, embedding, last_used_at in rows:
+                vector = np.asarray(embedding, dtype=np.float32)
+                embedding_lru.put((EMBEDDING_MODEL, dimensions, text_hash), (vector,))
+                found[text_hash] = (vector, 0)
+                EmbeddingCacheCrud.db_hits += 1
+                if last_used_at < utc_now() - LAST_USED_RESOLUTION:
+                    stale_ids.append(row_id)
+        if stale_ids:
+            await session.execute(
+                update(EmbeddingCache)
+                .where(EmbeddingCache.id.in_(stale_ids))
+                .values(last_used_at=utc_now())
+            )
+        new_texts = {
+            text_hash: text
+            for text_hash, text in zip(hashes, texts)
+            if text_hash not in found
+        }
+        if new_texts:
+            EmbeddingCacheCrud.db_misses += len(new_texts)
+            embeddings = await asyncio.wait_for(
+                get_vectors(
+                    texts=list(new_texts.values()),
+                    dimensions=dimensions,
+                    timeout=timeout,
+                ),
+                timeout=timeout,
+            )
+            new_rows = []
+            for text_hash, (embedding, usage) in zip(new_texts, embeddings):
+                vector = np.asarray(embedding, dtype=np.float32)
+                embedding_lru.put((EMBEDDING_MODEL, dimensions, text_hash), (vector,))
+                found[text_hash] = (vector, usage)
+                new_rows.append(
+                    {
+                        "model": EMBEDDING_MODEL,
+                        "dimensions": dimensions,
+                        "text_hash": text_hash,
+                        "embedding": vector,
+                        "tokens": usage,
+                    }
+                )
+            await session.execute(
+                insert(EmbeddingCache).on_conflict_do_nothing(
+                    index_elements=["model", "dimensions", "text_hash"]
+                ),
+                new_rows,
+            )
+        if stale_ids or new_texts:
+            await session.commit()
+        results, reported = [], set()
+        for text_hash in hashes:
+            vector, usage = found[text_hash]
+            results.append((vector, 0 if text_hash in reported else usage))
+            reported.add(text_hash)
+        return results
+
+    async def get_vector(
+        self,
+        *,
+        session: AsyncSession,
+        text: str,
+        dimensions: int = config.EMBEDDING_DIMENSIONS,
+        timeout: Optional[float] = None,
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Returns the embedding of a text through the cache.
+
+        Args:
+            session (AsyncSession): The database session.
+            text (str): The text to embed.
+            dimensions (int): The number of dimensions of the embedding (default: `EMBEDDING_DIMENSIONS`).
+            timeout (Optional[float]): The time in seconds allowed for generating the embedding, including
+                the wait for the embedding scheduler and retries (default: the client's timeout per request).
+
+        Returns:
+            np.ndarray: The embedding vector of the text.
+            int: The number of tokens used, 0 on a cache hit.
+
+        Raises:
+            asyncio.TimeoutError: If the embedding is not generated within `timeout`.
+        """
+        return (
+            await self.get_vectors(
+                session=session, texts=[text], dimensions=dimensions, timeout=timeout
+            )
+        )[0]
+
+    async def prune(self, *, session: AsyncSession, max_rows: int) -> int:
+        """
+        Deletes the least recently used cache entries beyond `max_rows`. The table is
+        only counted when the planner's estimate of its row count, kept up to date by
+        autovacuum, exceeds `max_rows`, so a check of a table within bounds is cheap.
+        Entries used at the same time are ordered by id, so exactly the excess is deleted.
+
+        Args:
+            session (AsyncSession): The database session.
+            max_rows (int): The maximum number of entries kept in the database.
+
+        Returns:
+            int: The number of deleted entries.
+        """
+        logger.info("Inside embeddingcache crud, executing prune ...")
+        estimate = await session.scalar(
+            text(
+                "SELECT reltuples FROM pg_class WHERE oid = 'embedding_cache'::regclass"
+            )
+        )
+        if estimate is None or estimate <= max_rows:
+            return 0
+        excess = (
+            select(EmbeddingCache.id)
+            .order_by(EmbeddingCache.last_used_at.desc(), EmbeddingCache.id.desc())
+            .offset(max_rows)
+        )
+        result = await session.execute(
+            delete(EmbeddingCache).where(EmbeddingCache.id.in_(excess))
+        )
+        await session.commit()
+        return result.rowcount
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Returns the hit and miss counters of both cache tiers.
+
+        Returns:
+            Dict[str, Any]: The counters of the in-process LRU and of the database table.
+        """
+        return {
+            "memory": embedding_lru.stats(),
+            "database": {"hits": cls.db_hits, "misses": cls.db_misses},
+        }
@@ -0,0 +1,158 @@
+"""
+This module defines the CRUD operations for managing ingestion jobs.
+It provides functionality to enqueue documents, to claim queued jobs for processing
+and to resume jobs abandoned by a stopped worker. A claimed job is owned by its attempt
+number: once the job is claimed again, the updates of the previous attempt match no row.
+"""
+
+from datetime import timedelta
+from typing import Any, Dict
+
+from models import Documents, IngestionJobs
+from models.base import utc_now
+from schemas import IngestionJobCreate
+from sqlalchemy import false, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils import logger
+
+from .base import BaseCrud
+
+
+class IngestionJobCrud(BaseCrud[IngestionJobs, IngestionJobCreate, IngestionJobCreate]):
+    """
+    CRUD class for managing ingestion jobs.
+    Provides methods to claim the next queued job and to resume stalled jobs.
+    """
+
+    def __init__(self):
+        """
+        Initializes the IngestionJobCrud with the IngestionJobs model.
+        """
+        super().__init__(model=IngestionJobs)
+
+    async def claim_next(self, *, session: AsyncSession) -> IngestionJobs | None:
+        """
+        Claims the oldest pending job. The row is locked with `FOR UPDATE SKIP LOCKED`,
+        so concurrent workers never claim the same job, and is marked PROCESSING
+        before the lock is released.
+
+        Args:
+            session (AsyncSession): The database session.
+
+        Returns:
+            IngestionJobs | None: The claimed job, or None if the queue is empty.
+        """
+        logger.info("Inside ingestionjob crud, executing claim_next ...")
+        query = (
+            select(IngestionJobs)
+            .where(
+                IngestionJobs.status == "PENDING",
+                IngestionJobs.is_deleted.is_(false()),
+            )
+            .order_by(IngestionJobs.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = (await session.execute(query)).scalars().first()
+        if not job:
+            await session.commit()
+            return None
+        job.status = "PROCESSING"
+        job.attempts += 1
+        job.locked_at = utc_now()
+        await session.commit()
+        return job
+
+    async def update_claimed(
+        self,
+        *,
+        session: AsyncSession,
+        job_id: int,
+        attempt: int,
+        values: Dict[str, Any],
+    ) -> bool:
+        """
+        Updates a PROCESSING job only if it is still held by the attempt that claimed it.
+        The update is not committed, so it can be committed together with its document's.
+
+        Args:
+            session (AsyncSession): The database session.
+            job_id (int): The ID of the job.
+            attempt (int): The attempt number the job was claimed with.
+            values (Dict[str, Any]): The new values of the job's columns.
+
+        Returns:
+            bool: True if the job was updated, False if another attempt has claimed it since.
+        """
+        logger.info("Inside ingestionjob crud, executing update_claimed ...")
+        result = await session.execute(
+            update(IngestionJobs)
+            .where(
+                IngestionJobs.id == job_id,
+                IngestionJobs.attempts == attempt,
+                IngestionJobs.status == "PROCESSING",
+            )
+            .values(**values, updated_at=utc_now())
+        )
+        return result.rowcount == 1
+
+    async def heartbeat(
+        self, *, session: AsyncSession, job_id: int, attempt: int
+    ) -> bool:
+        """
+        Refreshes the lock time of a job, showing that its worker is still making progress.
+
+        Args:
+            session (AsyncSession): The database session.
+            job_id (int): The ID of the job.
+            attempt (int): The attempt number the job was claimed with.
+
+        Returns:
+            bool: True if the job is still held by the attempt, False otherwise.
+        """
+        logger.info("Inside ingestionjob crud, executing heartbeat ...")
+        claimed = await self.update_claimed(
+            session=session,
+            job_id=job_id,
+            attempt=attempt,
+            values={"locked_at": utc_now()},
+        )
+        await session.commit()
+        return claimed
+
+    async def requeue_stalled(
+        self, *, session: AsyncSession, stalled_after: float
+    ) -> int:
+        """
+        Queues again the PROCESSING jobs whose worker has not sent a heartbeat for
+        `stalled_after` seconds, such as jobs left behind by a crash or restart.
+        Their documents go back to PENDING, and the next attempt resumes from
+        the last committed chunk.
+
+        Args:
+            session (AsyncSession): The database session.
+            stalled_after (float): The time in seconds without a heartbeat.
+
+        Returns:
+            int: The number of requeued jobs.
+        """
+        logger.info("Inside ingestionjob crud, executing requeue_stalled ...")
+        document_ids = (
+            await session.scalars(
+                update(IngestionJobs)
+                .where(
+                    IngestionJobs.status == "PROCESSING",
+                    IngestionJobs.locked_at < utc_now() - timedelta(seconds=stalled_after),
+                )
+                .values(status="PENDING", updated_at=utc_now())
+                .returning(IngestionJobs.document_id)
+            )
+        ).all()
+        if document_ids:
+            await session.execute(
+                update(Documents)
+                .where(Documents.id.in_(document_ids))
+                .values(status="PENDING", updated_at=utc_now())
+            )
+        await session.commit()
+        return len(document_ids)
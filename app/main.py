@@ -1,4 +1,5 @@
 import time
+from contextlib import asynccontextmanager
 
 import uvicorn
 from api.v1 import api_v1_router
@@ -12,7 +13,20 @@ from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from utils import logger
+from utils import logger, shutdown_pdf_workers
+from worker import ingestion_workers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs the in-process ingestion workers while the application is up and
+    releases the resources shared by requests when it stops.
+    """
+    async with ingestion_workers(count=config.INGESTION_WORKERS):
+        yield
+    shutdown_pdf_workers()
+
 
 app = FastAPI(
     title="document-qa",
@@ -25,6 +39,7 @@ app = FastAPI(
     openapi_url="/openapi.json",
     docs_url="/docs",
     redoc_url="/redocs",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -7,6 +7,8 @@ It imports and exposes the following models for use throughout the application:
 - Chats: Represents individual chat interactions within a session.
 - DocumentChunks: Represents chunks of a document.
 - Documents: Represents documents in the system.
+- EmbeddingCache: Represents cached embeddings.
+- IngestionJobs: Represents queued document ingestions.
 """
 
 from .base import Base as Base
@@ -14,3 +16,5 @@ from .chat_sessions import ChatSessions as ChatSessions
 from .chats import Chats as Chats
 from .document_chunks import DocumentChunks as DocumentChunks
 from .documents import Documents as Documents
+from .embedding_cache import EmbeddingCache as EmbeddingCache
+from .ingestion_jobs import IngestionJobs as IngestionJobs
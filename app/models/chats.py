@@ -3,12 +3,20 @@ This module defines the `Chats` model, which represents individual chat interact
 within a chat session. Each chat contains a question, an answer, and usage metadata,
 and is associated with a specific chat session.
 
+Answers are cached by the meaning of their question: a chat stores the embedding of
+its question and a key of the answer's scope (document, system message and model),
+so a similar question asked in the same scope can reuse the answer. A chat also stores
+a key of its whole request, so an identical request can reuse the answer without
+embedding the question at all. Chats are indexed by session, so the latest turns
+of a conversation are read without scanning the table.
+
 The `Chats` model inherits common fields and configurations from the `Base` class.
 """
 
-from typing import Optional
+from typing import List, Optional
 
-from sqlalchemy import ForeignKey
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, id, string
@@ -24,14 +32,28 @@ class Chats(Base):
         question (str): The question asked in the chat.
         answer (str): The answer provided in the chat.
         usage (Optional[str]): Metadata about the usage of the chat (e.g., token usage).
+        question_embedding (Optional[list]): The embedding of the question, loaded only when accessed.
+        cache_key (Optional[str]): The key of the answer's scope in the answer cache, None if the answer is not cached.
+        response_key (Optional[str]): The key of the request in the response cache, None if the answer is not cached.
         session (ChatSessions): The chat session associated with this chat.
     """
 
+    __table_args__ = (Index("ix_chats_session_id_id", "session_id", "id"),)
+
     id: Mapped[id]
     session_id: Mapped[int] = mapped_column(
         ForeignKey("chat_sessions.id"), nullable=False
     )
     question: Mapped[string]
     answer: Mapped[string]
+    question_embedding: Mapped[Optional[List[float]]] = mapped_column(
+        Vector(), nullable=True, deferred=True
+    )
+    cache_key: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, index=True
+    )
+    response_key: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, index=True
+    )
 
     session: Mapped["ChatSessions"] = relationship(back_populates="chats")
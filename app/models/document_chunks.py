@@ -1,20 +1,42 @@
 """
 This module defines the `DocumentChunk` model, which represents chunks of a document.
-Each chunk contains a portion of the document's content, its embedding vector, and
-the page number it belongs to. The model establishes a relationship with the `Document`
+Each chunk contains a portion of the document's content, its embedding vector, its
+position in the document and the range of pages it spans. The model establishes a relationship with the `Document`
 model, allowing chunks to be associated with a specific document.
 
+Embeddings of any dimension can be stored, since documents may be embedded with fewer
+dimensions than the model's default. Each dimension in `INDEXED_DIMENSIONS` has its own
+partial HNSW index on the embeddings of that dimension: in full precision, or with a
+"half" or "binary" `EMBEDDING_STORAGE`, on the quantized embeddings only, so the index
+is smaller and the embeddings are only kept in full precision in the table, for
+re-ranking. The indexes are built with the `HNSW_M` and `HNSW_EF_CONSTRUCTION` settings.
+These settings come from `config`, like the search queries', so the indexes always match
+the operators the queries use. The content is also indexed
+for full-text search, through a `tsvector` column generated by PostgreSQL with the
+`TEXT_SEARCH_CONFIG` configuration and a GIN index.
+
+The table is hash-partitioned by `document_id` into `PARTITION_COUNT` partitions, so a
+search scoped to one document only scans, and only uses the indexes of, one partition.
+The partitions are created together with the table, so storing chunks never runs DDL
+that would lock the table against searches.
+
 The `DocumentChunk` model inherits common fields and configurations from the `Base` class.
 """
 
 from typing import List, Optional
 
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import ForeignKey, Integer
+from config import config
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import DDL, Computed, ForeignKey, Index, Integer, cast, event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, id
 
+PARTITION_COUNT = 16
+INDEXED_DIMENSIONS = (256, 512, 1024, 1536)
+TEXT_SEARCH_CONFIG = "english"
+
 
 class DocumentChunks(Base):
     """
@@ -24,17 +46,89 @@ class DocumentChunks(Base):
         id (int): The unique identifier for the document chunk.
         document_id (int): The ID of the document this chunk belongs to.
         content (str): The content of the chunk.
-        embedding (Optional[list]): The embedding vector for the chunk's content.
-        page_number (Optional[int]): The page number of the document this chunk belongs to.
+        embedding (Optional[list]): The embedding vector for the chunk's content, loaded only when accessed.
+        page_number (Optional[int]): The page number of the document this chunk starts on.
+        page_end (Optional[int]): The page number of the document this chunk ends on.
+        chunk_index (Optional[int]): The position of the chunk in the document, starting at 0.
+        search_vector (str): The lexemes of the content, generated by the database for full-text search.
         document (Document): The document associated with this chunk.
     """
 
+    __table_args__ = (
+        Index(
+            "ix_document_chunks_document_id_chunk_index",
+            "document_id",
+            "chunk_index",
+            unique=True,
+        ),
+        Index(
+            "ix_document_chunks_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+        ),
+        {"postgresql_partition_by": "HASH (document_id)"},
+    )
+
     id: Mapped[id]
-    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"), nullable=False)
+    document_id: Mapped[int] = mapped_column(
+        ForeignKey("documents.id"), primary_key=True
+    )
     content: Mapped[str] = mapped_column(nullable=False)
     embedding: Mapped[Optional[List[float]]] = mapped_column(
-        Vector(1536), nullable=True
+        Vector(), nullable=True, deferred=True
     )
     page_number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    page_end: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    chunk_index: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"to_tsvector('{TEXT_SEARCH_CONFIG}'::regconfig, (content)::text)",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     document: Mapped["Documents"] = relationship(back_populates="chunks")
+
+
+for dimensions in INDEXED_DIMENSIONS:
+    if config.EMBEDDING_STORAGE == "half":
+        name, expression, ops = (
+            f"ix_document_chunks_embedding_{dimensions}_halfvec_hnsw",
+            cast(DocumentChunks.embedding, HALFVEC(dimensions)),
+            "halfvec_cosine_ops",
+        )
+    elif config.EMBEDDING_STORAGE == "binary":
+        name, expression, ops = (
+            f"ix_document_chunks_embedding_{dimensions}_bit_hnsw",
+            cast(func.binary_quantize(DocumentChunks.embedding), BIT(dimensions)),
+            "bit_hamming_ops",
+        )
+    else:
+        name, expression, ops = (
+            f"ix_document_chunks_embedding_{dimensions}_hnsw",
+            cast(DocumentChunks.embedding, Vector(dimensions)),
+            "vector_cosine_ops",
+        )
+    Index(
+        name,
+        expression.label("embedding"),
+        postgresql_using="hnsw",
+        postgresql_ops={"embedding": ops},
+        postgresql_with={
+            "m": config.HNSW_M,
+            "ef_construction": config.HNSW_EF_CONSTRUCTION,
+        },
+        postgresql_where=func.vector_dims(DocumentChunks.embedding) == dimensions,
+    )
+
+for remainder in range(PARTITION_COUNT):
+    event.listen(
+        DocumentChunks.__table__,
+        "after_create",
+        DDL(
+            f"CREATE TABLE document_chunks_p{remainder} PARTITION OF document_chunks "
+            f"FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder})"
+        ),
+    )
@@ -9,7 +9,7 @@ The `Document` model inherits common fields and configurations from the `Base` c
 
 from typing import List, Optional
 
-from sqlalchemy import Float
+from sqlalchemy import Float, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, id, string
@@ -22,11 +22,15 @@ class Documents(Base):
     Attributes:
         id (int): The unique identifier for the document.
         filename (str): The name of the file associated with the document.
-        status (str): The processing status of the document (default: "PENDING").
+        status (str): The processing status of the document, one of PENDING, PROCESSING,
+            COMPLETED or FAILED (default: "PENDING").
         embedding_model (str): The embedding model used for processing the document
             (default: "text-embedding-3-small").
+        embedding_dimensions (int): The number of dimensions of the document's embeddings (default: 1536).
         processing_time (Optional[float]): The time taken to process the document, in seconds.
+        content_hash (Optional[str]): The md5 hex digest of the file content, used to detect re-uploads.
         chunks (List[DocumentChunk]): The list of chunks associated with the document.
+        ingestion_jobs (List[IngestionJobs]): The ingestion jobs queued for the document.
     """
 
     id: Mapped[id]
@@ -35,9 +39,18 @@ class Documents(Base):
     embedding_model: Mapped[string] = mapped_column(
         default="text-embedding-3-small", nullable=True
     )
+    embedding_dimensions: Mapped[int] = mapped_column(
+        Integer, server_default="1536", nullable=False
+    )
     processing_time: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(32), index=True, nullable=True
+    )
 
     chunks: Mapped[List["DocumentChunks"]] = relationship(back_populates="document")
     chat_sessions: Mapped[List["ChatSessions"]] = relationship(
         back_populates="document"
     )
+    ingestion_jobs: Mapped[List["IngestionJobs"]] = relationship(
+        back_populates="document"
+    )
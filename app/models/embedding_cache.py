@@ -0,0 +1,44 @@
+"""
+This module defines the `EmbeddingCache` model, which stores previously generated embeddings.
+Each entry is keyed by the embedding model, the number of dimensions and the sha256 of the
+embedded text, so the same text is never sent to the embedding API twice. Entries record
+when they were last found in the table, so the least recently used ones are pruned first.
+
+The `EmbeddingCache` model inherits common fields and configurations from the `Base` class.
+"""
+
+from datetime import datetime
+from typing import List
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import TIMESTAMP, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, id, string, utc_now
+
+
+class EmbeddingCache(Base):
+    """
+    Represents a cached embedding.
+
+    Attributes:
+        id (int): The unique identifier for the cache entry.
+        model (str): The embedding model that generated the embedding.
+        dimensions (int): The number of dimensions of the embedding.
+        text_hash (str): The sha256 hex digest of the embedded text.
+        embedding (list): The embedding vector of the text.
+        tokens (int): The number of tokens the embedding request consumed.
+        last_used_at (datetime): When the embedding was stored or last found in the table.
+    """
+
+    __table_args__ = (UniqueConstraint("model", "dimensions", "text_hash"),)
+
+    id: Mapped[id]
+    model: Mapped[string]
+    dimensions: Mapped[int] = mapped_column(nullable=False)
+    text_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    embedding: Mapped[List[float]] = mapped_column(Vector(), nullable=False)
+    tokens: Mapped[int] = mapped_column(default=0, nullable=False)
+    last_used_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), default=utc_now, index=True, nullable=False
+    )
@@ -0,0 +1,46 @@
+"""
+This module defines the `IngestionJobs` model, which represents queued document ingestions.
+Each job points to a document and to the uploaded file waiting to be processed. Jobs are
+claimed by ingestion workers with `SELECT ... FOR UPDATE SKIP LOCKED`, so the table acts
+as a durable work queue without an external broker.
+
+The `IngestionJobs` model inherits common fields and configurations from the `Base` class.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import TIMESTAMP, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from .base import Base, id, string
+
+
+class IngestionJobs(Base):
+    """
+    Represents a queued ingestion of a document.
+
+    Attributes:
+        id (int): The unique identifier for the ingestion job.
+        document_id (int): The ID of the document being ingested.
+        file_path (str): The path of the uploaded file to ingest.
+        status (str): The status of the job (PENDING, PROCESSING, COMPLETED or FAILED).
+        attempts (int): The number of times the job has been claimed.
+        last_error (Optional[str]): The error of the last failed attempt.
+        locked_at (Optional[datetime]): When the job was last claimed by a worker.
+        document (Documents): The document associated with this job.
+    """
+
+    __table_args__ = (Index("ix_ingestion_jobs_status_id", "status", "id"),)
+
+    id: Mapped[id]
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"), nullable=False)
+    file_path: Mapped[string]
+    status: Mapped[string] = mapped_column(default="PENDING", nullable=False)
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(nullable=True)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+
+    document: Mapped["Documents"] = relationship(back_populates="ingestion_jobs")
@@ -1,10 +1,18 @@
+from .request import BatchQuestionRequest as BatchQuestionRequest
 from .request import ChatCreate as ChatCreate
 from .request import ChatSessionCreate as ChatSessionCreate
 from .request import ChunkCreate as ChunkCreate
 from .request import DocumentCreate as DocumentCreate
 from .request import DocumentUpdate as DocumentUpdate
+from .request import EmbeddingCacheCreate as EmbeddingCacheCreate
+from .request import IngestionJobCreate as IngestionJobCreate
+from .request import OpenAIModel as OpenAIModel
 from .request import QuestionRequest as QuestionRequest
+from .request import SearchMode as SearchMode
+from .response import BatchChatCompletion as BatchChatCompletion
+from .response import CacheStats as CacheStats
 from .response import ChatCompletion as ChatCompletion
 from .response import CreateChatSession as CreateChatSession
 from .response import DocumentGet as DocumentGet
 from .response import DocumentIngestion as DocumentIngestion
+from .response import DocumentStatus as DocumentStatus
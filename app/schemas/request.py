@@ -41,6 +41,22 @@ class ChunkCreate(BaseModel):
     pass
 
 
+class IngestionJobCreate(BaseModel):
+    """
+    Schema for creating a new ingestion job.
+    """
+
+    pass
+
+
+class EmbeddingCacheCreate(BaseModel):
+    """
+    Schema for creating a new embedding cache entry.
+    """
+
+    pass
+
+
 class ChatSessionCreate(BaseModel):
     """
     Schema for creating a new chat session.
@@ -64,6 +80,16 @@ class OpenAIModel(str, Enum):
     GPT_4_0125_PREVIEW = "gpt-4-0125-preview"
 
 
+class SearchMode(str, Enum):
+    """
+    Enum for the retrieval modes of a question.
+    """
+
+    VECTOR = "vector"
+    LEXICAL = "lexical"
+    HYBRID = "hybrid"
+
+
 class QuestionRequest(BaseModel):
     """
     Schema for submitting a question to the system.
@@ -72,3 +98,30 @@ class QuestionRequest(BaseModel):
     question: str = Field(..., example="What is the purpose of region in AWS?")
     model: Optional[OpenAIModel] = Field("gpt-3.5-turbo")
     max_tokens: Optional[int] = Field(300)
+    search_mode: Optional[SearchMode] = Field(None, example="hybrid")
+    k: int = Field(3, ge=1, le=20)
+    fetch_k: int = Field(20, ge=1, le=100)
+    mmr_lambda: float = Field(0.5, ge=0, le=1)
+    compression_ratio: Optional[float] = Field(None, gt=0, le=1, example=0.3)
+    use_cache: bool = Field(True, example=True)
+    use_history: bool = Field(False, example=True)
+
+
+class BatchQuestionRequest(BaseModel):
+    """
+    Schema for submitting many questions to the system at once.
+    """
+
+    questions: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        example=["What is the purpose of region in AWS?", "What is an availability zone?"],
+    )
+    model: Optional[OpenAIModel] = Field("gpt-3.5-turbo")
+    max_tokens: Optional[int] = Field(300)
+    search_mode: Optional[SearchMode] = Field(None, example="hybrid")
+    k: int = Field(3, ge=1, le=20)
+    fetch_k: int = Field(20, ge=1, le=100)
+    mmr_lambda: float = Field(0.5, ge=0, le=1)
+    compression_ratio: Optional[float] = Field(None, gt=0, le=1, example=0.3)
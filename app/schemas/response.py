@@ -4,6 +4,7 @@ These schemas are used for data validation and serialization of API responses.
 """
 
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -27,6 +28,7 @@ class DocumentGet(BaseModel):
     filename: str = Field(example="paper.pdf")
     status: str = Field(example="COMPLETED")
     embedding_model: str = Field(example="text-embedding-3-small")
+    embedding_dimensions: int = Field(example=1536)
     processing_time: float = Field(example=18.672)
     metadata_info: DocumentMetadata
     is_deleted: bool = Field(example=False)
@@ -41,8 +43,20 @@ class DocumentIngestion(BaseModel):
 
     id: int = Field(example=5)
     filename: str = Field(example="paper.pdf")
+    status: str = Field(example="PENDING")
     metadata_info: DocumentMetadata
-    usage: int = Field(example=546)
+
+
+class DocumentStatus(BaseModel):
+    """
+    Schema for document ingestion status response.
+    """
+
+    id: int = Field(example=5)
+    status: str = Field(example="COMPLETED")
+    processing_time: Optional[float] = Field(example=18.672)
+    usage: Optional[int] = Field(example=546)
+    error: Optional[str] = Field(example=None)
 
 
 class MetadataInfo(BaseModel):
@@ -75,3 +89,22 @@ class ChatCompletion(BaseModel):
     metadata_info: MetadataInfo
     chat_id: int = Field(example=5)
     created_at: datetime
+    cached: bool = Field(False, example=False)
+
+
+class BatchChatCompletion(BaseModel):
+    """
+    Schema for batch chat completion response.
+    """
+
+    session_id: int = Field(example=5)
+    chats: List[ChatCompletion]
+
+
+class CacheStats(BaseModel):
+    """
+    Schema for cache statistics response.
+    """
+
+    answers: Dict[str, Any]
+    embeddings: Dict[str, Any]
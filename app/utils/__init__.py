@@ -1,3 +1,21 @@
+from .cache import LRUCache
+from .chunking import chunk_pages
+from .compression import compress_texts
 from .logging import logger
-from .openai_platform import chat_completion, get_vector
+from .openai_platform import (
+    EMBEDDING_MODEL,
+    MAX_OUTPUT_TOKENS,
+    chat_completion,
+    condense_question,
+    context_budget,
+    get_vector,
+    get_vectors,
+    stream_chat_completion,
+    summarize_conversation,
+)
+from .pdf import count_pages, iter_text_per_page, shutdown_pdf_workers
+from .pg_copy import encode_copy_binary
 from .session import get_db_session
+from .tokens import estimate_tokens, pack_texts
+from .uploads import spool_upload
+from .vector_search import build_matrix, mmr, top_k
@@ -0,0 +1,124 @@
+"""
+This module provides a bounded, in-process LRU cache with hit and miss counters.
+Entries are weighed by a size function so the cache can be bounded by item count
+or by memory, and can optionally expire after a time to live.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    A least-recently-used cache bounded by the total size of its entries.
+
+    Attributes:
+        max_size (float): The maximum total size of the entries.
+        size (float): The current total size of the entries.
+        hits (int): The number of lookups that found an entry.
+        misses (int): The number of lookups that found no entry.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: float,
+        size_of: Callable[[Any], float] = lambda value: 1,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (float): The maximum total size of the entries.
+            size_of (Callable[[Any], float]): The size of a value (default: 1 per entry).
+            ttl (Optional[float]): The time to live of an entry in seconds (default: no expiry).
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._size_of = size_of
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Returns the value of a key and marks it as recently used.
+
+        Args:
+            key (Hashable): The key to look up.
+
+        Returns:
+            Any: The cached value, or None if the key is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None or (entry[2] and entry[2] < time.monotonic()):
+            if entry is not None:
+                self.invalidate(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, *, ttl: Optional[float] = None) -> None:
+        """
+        Stores a value, evicting the least recently used entries to stay within
+        `max_size`. A value larger than `max_size` is not stored.
+
+        Args:
+            key (Hashable): The key of the value.
+            value (Any): The value to store.
+            ttl (Optional[float]): The time to live of this entry in seconds (default: the cache's).
+        """
+        self.invalidate(key)
+        size = self._size_of(value)
+        if size > self.max_size:
+            return
+        ttl = ttl if ttl is not None else self._ttl
+        expires_at = time.monotonic() + ttl if ttl else 0
+        self._entries[key] = (value, size, expires_at)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Removes a key from the cache if it is present.
+
+        Args:
+            key (Hashable): The key to remove.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self) -> None:
+        """
+        Removes every entry from the cache.
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            Dict[str, Any]: The entries, size, hits, misses and hit rate of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
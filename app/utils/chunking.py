@@ -0,0 +1,65 @@
+"""
+This module provides a token-aware chunker for extracted document text.
+Pages are merged into a stream of words which is cut into chunks of a configured
+token size with a configured overlap, keeping track of the pages each chunk spans.
+"""
+
+import re
+from collections import deque
+from typing import AsyncIterator, Deque, Tuple
+
+from .tokens import estimate_tokens
+
+WORD_PATTERN = re.compile(r"\S+\s*")
+
+
+async def chunk_pages(
+    pages: AsyncIterator[Tuple[int, str]], *, chunk_tokens: int, overlap_tokens: int
+) -> AsyncIterator[Tuple[int, int, str]]:
+    """
+    Splits a stream of pages into chunks of about `chunk_tokens` tokens. Consecutive
+    chunks share about `overlap_tokens` tokens, and a chunk may span several pages.
+    Pages without text produce no chunks.
+
+    Args:
+        pages (AsyncIterator[Tuple[int, str]]): The page number and text of each page, in page order.
+        chunk_tokens (int): The target number of tokens of a chunk.
+        overlap_tokens (int): The number of tokens repeated at the start of the next chunk.
+
+    Yields:
+        Tuple[int, int, str]: The first page, last page and content of each chunk.
+    """
+    overlap_tokens = min(overlap_tokens, chunk_tokens // 2)
+    window: Deque[Tuple[int, str, int]] = deque()
+    window_tokens, unsent_words = 0, 0
+    async for page_number, text in pages:
+        for match in WORD_PATTERN.finditer(text or ""):
+            word = match.group()
+            tokens = estimate_tokens(word)
+            window.append((page_number, word, tokens))
+            window_tokens += tokens
+            unsent_words += 1
+            if window_tokens >= chunk_tokens:
+                yield _to_chunk(window)
+                unsent_words = 0
+                while window and window_tokens > overlap_tokens:
+                    window_tokens -= window.popleft()[2]
+        if window and not window[-1][1][-1].isspace():
+            page, word, tokens = window.pop()
+            window.append((page, word + "\n", tokens))
+    if unsent_words:
+        yield _to_chunk(window)
+
+
+def _to_chunk(window: Deque[Tuple[int, str, int]]) -> Tuple[int, int, str]:
+    """
+    Builds a chunk from the words of the window.
+
+    Args:
+        window (Deque[Tuple[int, str, int]]): The page number, word and token count of each word.
+
+    Returns:
+        Tuple[int, int, str]: The first page, last page and content of the chunk.
+    """
+    content = "".join(word for _, word, _ in window).strip()
+    return window[0][0], window[-1][0], content
@@ -0,0 +1,100 @@
+"""
+This module provides extractive compression of retrieved chunks with NumPy.
+The chunks are split into sentences, each sentence is scored against the question
+with BM25 over the retrieved sentences, and only the best sentences are kept, in
+their original order, until a target share of the original text is reached. It
+runs locally, without embedding the sentences or calling a model.
+"""
+
+import re
+from typing import List
+
+import numpy as np
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+TERM = re.compile(r"\w+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits a text into sentences at sentence-ending punctuation followed by whitespace.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The non-empty sentences of the text, in order.
+    """
+    return [sentence for sentence in SENTENCE_BOUNDARY.split(text.strip()) if sentence]
+
+
+def score_sentences(question: str, sentences: List[str]) -> np.ndarray:
+    """
+    Scores sentences against a question with BM25, the sentences being the corpus.
+    Only the terms of the question are counted, so the term matrix has one column per
+    distinct question term. The terms of all sentences are matched against the sorted
+    question terms at once, and counted into the matrix without a Python loop per term.
+
+    Args:
+        question (str): The user's question.
+        sentences (List[str]): The sentences to score.
+
+    Returns:
+        np.ndarray: The score of each sentence, 0 for a sentence sharing no term with the question.
+    """
+    query_terms = np.unique(TERM.findall(question.lower()))
+    if not query_terms.size or not sentences:
+        return np.zeros(len(sentences), dtype=np.float32)
+    sentence_terms = [TERM.findall(sentence.lower()) for sentence in sentences]
+    lengths = np.array([len(terms) for terms in sentence_terms], dtype=np.float32)
+    terms = np.array([term for terms in sentence_terms for term in terms], dtype=str)
+    rows = np.repeat(np.arange(len(sentences)), lengths.astype(int))
+    columns = np.searchsorted(query_terms, terms)
+    matched = columns < query_terms.size
+    matched[matched] = query_terms[columns[matched]] == terms[matched]
+    frequencies = np.zeros((len(sentences), query_terms.size), dtype=np.float32)
+    np.add.at(frequencies, (rows[matched], columns[matched]), 1)
+    document_frequencies = np.count_nonzero(frequencies, axis=0)
+    idf = np.log1p(
+        (len(sentences) - document_frequencies + 0.5) / (document_frequencies + 0.5)
+    )
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1))
+    saturated = frequencies * (BM25_K1 + 1) / (frequencies + length_norm[:, None])
+    return saturated @ idf
+
+
+def compress_texts(*, question: str, texts: List[str], ratio: float) -> List[str]:
+    """
+    Keeps the sentences of texts most relevant to a question, until their length reaches
+    `ratio` of the texts' length. A sentence that would exceed it is skipped for a shorter
+    one, and the best sentence is always kept.
+
+    Args:
+        question (str): The user's question.
+        texts (List[str]): The texts to compress.
+        ratio (float): The share of the texts' characters to keep, between 0 and 1.
+
+    Returns:
+        List[str]: The kept sentences of each text joined in their original order,
+            or an empty string for a text without any kept sentence.
+    """
+    sentences = [
+        (index, sentence)
+        for index, text in enumerate(texts)
+        for sentence in split_sentences(text)
+    ]
+    scores = score_sentences(question, [sentence for _, sentence in sentences])
+    budget = ratio * sum(len(text) for text in texts)
+    kept, used = np.zeros(len(sentences), dtype=bool), 0
+    for position in np.argsort(-scores, kind="stable"):
+        length = len(sentences[position][1])
+        if used + length <= budget or not used:
+            kept[position] = True
+            used += length
+    compressed = [[] for _ in texts]
+    for (index, sentence), keep in zip(sentences, kept):
+        if keep:
+            compressed[index].append(sentence)
+    return [" ".join(parts) for parts in compressed]
@@ -1,45 +1,416 @@
 """
 This module provides utility functions for generating embeddings using the OpenAI API.
-It allows users to generate vector embeddings for a given text using a specified model.
+It allows users to generate vector embeddings for a given text using a specified model,
+shortened to a requested number of dimensions, and answers questions from a document's
+context, either at once or streamed as the answer is generated. The context of a question
+is sized to the chat model's context window with the local token estimator. Questions can
+carry the recent turns of their conversation and a rolling summary of the earlier ones.
 """
 
-from typing import List, Tuple
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from openai import AsyncOpenAI
+from config import config
+from openai import NOT_GIVEN, AsyncOpenAI
+from openai.types import CreateEmbeddingResponse
+
+from .rate_limiter import EmbeddingScheduler
+from .tokens import estimate_tokens
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# The context window and the maximum completion tokens of each chat model.
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-0125": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106-preview": 128000,
+    "gpt-4-0125-preview": 128000,
+}
+MAX_OUTPUT_TOKENS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-0125": 4096,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 4096,
+    "gpt-4-1106-preview": 4096,
+    "gpt-4-0125-preview": 4096,
+}
+# The tokens the chat format adds for each message, and to prime the reply.
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+# The share of the context window left free, since prompt sizes are only estimated.
+CONTEXT_WINDOW_MARGIN = 0.1
 
 client = AsyncOpenAI()
+# Embedding requests are retried by the scheduler, which backs off for every request
+# in flight on rate limit errors, instead of each request retrying on its own.
+embedding_client = client.with_options(max_retries=0)
+embedding_scheduler = EmbeddingScheduler(
+    max_concurrency=config.EMBEDDING_MAX_CONCURRENCY,
+    requests_per_minute=config.EMBEDDING_REQUESTS_PER_MINUTE,
+    tokens_per_minute=config.EMBEDDING_TOKENS_PER_MINUTE,
+    max_retries=config.EMBEDDING_MAX_RETRIES,
+)
 
 
-async def get_vector(*, text: str) -> Tuple[List[float], int]:
+async def _create_embeddings(
+    *, texts: List[str], dimensions: int, timeout: Optional[float] = None
+) -> CreateEmbeddingResponse:
+    """
+    Sends one embeddings request through the embedding scheduler.
+
+    Args:
+        texts (List[str]): The input texts of the request.
+        dimensions (int): The number of dimensions of the embeddings.
+        timeout (Optional[float]): The timeout of the request in seconds (default: the client's).
+
+    Returns:
+        CreateEmbeddingResponse: The OpenAI embeddings response.
+    """
+    tokens = sum(estimate_tokens(text) for text in texts)
+    return await embedding_scheduler.submit(
+        request=lambda: embedding_client.embeddings.create(
+            input=texts,
+            model=EMBEDDING_MODEL,
+            dimensions=dimensions,
+            timeout=timeout or NOT_GIVEN,
+        ),
+        tokens=tokens,
+    )
+
+
+async def get_vector(
+    *, text: str, dimensions: int = config.EMBEDDING_DIMENSIONS
+) -> Tuple[List[float], int]:
     """
     Generates a vector embedding for the given text using the specified OpenAI model.
 
     Args:
         text (str): The input text for which the embedding is to be generated.
+        dimensions (int): The number of dimensions of the embedding (default: `EMBEDDING_DIMENSIONS`).
 
     Returns:
         List[float]: The embedding vector for the input text.
         int: The total number of tokens used in the request.
     """
-    response = await client.embeddings.create(
-        input=text, model="text-embedding-3-small"
-    )
+    response = await _create_embeddings(texts=[text], dimensions=dimensions)
     return response.data[0].embedding, response.usage.total_tokens
 
 
+def _plan_batches(texts: List[str]) -> List[List[int]]:
+    """
+    Groups text indexes into batches that respect the token and item budgets
+    of a single embeddings request. A text larger than the token budget is
+    sent in a batch of its own.
+
+    Args:
+        texts (List[str]): The input texts.
+
+    Returns:
+        List[List[int]]: The indexes of the texts in each batch, in input order.
+    """
+    batches, current, current_tokens = [], [], 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            current_tokens + tokens > config.EMBEDDING_BATCH_MAX_TOKENS
+            or len(current) >= config.EMBEDDING_BATCH_MAX_ITEMS
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _split_usage(total_tokens: int, texts: List[str]) -> List[int]:
+    """
+    Splits the token usage reported for a batch across its texts,
+    proportionally to their estimated size. The parts add up to the total.
+
+    Args:
+        total_tokens (int): The total number of tokens reported for the batch.
+        texts (List[str]): The texts of the batch.
+
+    Returns:
+        List[int]: The token usage attributed to each text.
+    """
+    estimates = [estimate_tokens(text) for text in texts]
+    estimated_total = sum(estimates)
+    usages = [total_tokens * estimate // estimated_total for estimate in estimates]
+    usages[-1] += total_tokens - sum(usages)
+    return usages
+
+
+async def get_vectors(
+    *,
+    texts: List[str],
+    dimensions: int = config.EMBEDDING_DIMENSIONS,
+    timeout: Optional[float] = None,
+) -> List[Tuple[List[float], int]]:
+    """
+    Generates vector embeddings for many texts, packing them into as few
+    embeddings requests as the configured token and item budgets allow.
+
+    Args:
+        texts (List[str]): The input texts for which the embeddings are to be generated.
+        dimensions (int): The number of dimensions of the embeddings (default: `EMBEDDING_DIMENSIONS`).
+        timeout (Optional[float]): The timeout of each request in seconds (default: the client's).
+
+    Returns:
+        List[Tuple[List[float], int]]: The embedding vector and the token usage
+            of each text, in the same order as the input.
+    """
+    results: List[Tuple[List[float], int]] = [None] * len(texts)
+    batches = _plan_batches(texts)
+    responses = await asyncio.gather(
+        *(
+            _create_embeddings(
+                texts=[texts[index] for index in batch],
+                dimensions=dimensions,
+                timeout=timeout,
+            )
+            for batch in batches
+        )
+    )
+    for batch, response in zip(batches, responses):
+        usages = _split_usage(
+            response.usage.total_tokens, [texts[index] for index in batch]
+        )
+        for item in response.data:
+            results[batch[item.index]] = (item.embedding, usages[item.index])
+    return results
+
+
+def _chat_messages(
+    *,
+    context: str,
+    system_message: str,
+    question: str,
+    summary: str = "",
+    history: Sequence[Tuple[str, str]] = (),
+) -> List[Dict[str, str]]:
+    """
+    Builds the messages of a question answered from a document's context.
+
+    Args:
+        context (str): The retrieved chunks of the document.
+        system_message (str): The system message of the chat session.
+        question (str): The user's question.
+        summary (str): The summary of the conversation before `history` (default: none).
+        history (Sequence[Tuple[str, str]]): The previous questions and answers, oldest first (default: none).
+
+    Returns:
+        List[Dict[str, str]]: The system message, the previous turns and the user message.
+    """
+    system_message += "If data is found inside the document also mention the page number from which the response is provided. In case relevant data is not found. Say 'Document doesn't contain enough data.'"
+    if summary:
+        system_message += f"\n\nSummary of the conversation so far: {summary}"
+    messages = [{"role": "system", "content": system_message}]
+    for previous_question, previous_answer in history:
+        messages.append({"role": "user", "content": previous_question})
+        messages.append({"role": "assistant", "content": previous_answer})
+    messages.append(
+        {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"}
+    )
+    return messages
+
+
+def context_budget(
+    *,
+    system_message: str,
+    question: str,
+    max_tokens: Optional[int],
+    model: str,
+    summary: str = "",
+    history: Sequence[Tuple[str, str]] = (),
+) -> int:
+    """
+    Estimates the number of tokens left for the context of a question in the model's
+    context window, after the system message, the conversation, the question and the completion.
+    `CONTEXT_WINDOW_MARGIN` of the window is kept free, since the token counts are estimated.
+    Without `max_tokens`, the answer can use what the prompt leaves of the window, so half
+    of it, at most the model's maximum output, is kept for the answer and the rest for the context.
+
+    Args:
+        system_message (str): The system message of the chat session.
+        question (str): The user's question.
+        max_tokens (Optional[int]): The maximum number of tokens of the answer, or None for no limit.
+        model (str): The chat model.
+        summary (str): The summary of the conversation before `history` (default: none).
+        history (Sequence[Tuple[str, str]]): The previous questions and answers (default: none).
+
+    Returns:
+        int: The number of tokens available for the context, negative if even an
+            empty context does not fit.
+    """
+    messages = _chat_messages(
+        context="",
+        system_message=system_message,
+        question=question,
+        summary=summary,
+        history=history,
+    )
+    prompt_tokens = TOKENS_PER_REPLY + sum(
+        estimate_tokens(message["content"]) + TOKENS_PER_MESSAGE for message in messages
+    )
+    available = int(CONTEXT_WINDOWS[model] * (1 - CONTEXT_WINDOW_MARGIN)) - prompt_tokens
+    if not max_tokens:
+        max_tokens = min(MAX_OUTPUT_TOKENS[model], max(available, 0) // 2)
+    return available - max_tokens
+
+
 async def chat_completion(
-    *, context: str, system_message: str, question: str, max_tokens: int, model: str
+    *,
+    context: str,
+    system_message: str,
+    question: str,
+    max_tokens: int,
+    model: str,
+    summary: str = "",
+    history: Sequence[Tuple[str, str]] = (),
 ) -> Tuple[str, str, int]:
-    system_message += "If data is found inside the document also mention the page number from which the response is provided. In case relevant data is not found. Say 'Document doesn't contain enough data.'"
     completion = await client.chat.completions.create(
         model=model,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"},
-        ],
+        messages=_chat_messages(
+            context=context,
+            system_message=system_message,
+            question=question,
+            summary=summary,
+            history=history,
+        ),
         max_tokens=max_tokens,
     )
     completion_id = completion.id
     usage = completion.usage.completion_tokens
     assistant_response = completion.choices[0].message.content
     return assistant_response, completion_id, usage
+
+
+async def stream_chat_completion(
+    *,
+    context: str,
+    system_message: str,
+    question: str,
+    max_tokens: int,
+    model: str,
+    summary: str = "",
+    history: Sequence[Tuple[str, str]] = (),
+) -> AsyncIterator[Tuple[str, str, int]]:
+    """
+    Generates an answer like `chat_completion`, yielding its content as it is generated.
+
+    Args:
+        context (str): The retrieved chunks of the document.
+        system_message (str): The system message of the chat session.
+        question (str): The user's question.
+        max_tokens (int): The maximum number of tokens of the answer.
+        model (str): The chat model.
+        summary (str): The summary of the conversation before `history` (default: none).
+        history (Sequence[Tuple[str, str]]): The previous questions and answers, oldest first (default: none).
+
+    Yields:
+        Tuple[str, str, int]: The next part of the answer, the completion ID, and the number
+            of completion tokens, which is only reported with the last item (0 before).
+    """
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=_chat_messages(
+            context=context,
+            system_message=system_message,
+            question=question,
+            summary=summary,
+            history=history,
+        ),
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        usage = chunk.usage.completion_tokens if chunk.usage else 0
+        if delta or usage:
+            yield delta or "", chunk.id, usage
+
+
+async def summarize_conversation(
+    *, summary: str, turns: Sequence[Tuple[str, str]], max_tokens: int, model: str
+) -> Tuple[str, int]:
+    """
+    Folds turns of a conversation into its rolling summary, so the summary is updated
+    incrementally and its size stays bounded however long the conversation runs.
+
+    Args:
+        summary (str): The current summary of the conversation, empty if there is none yet.
+        turns (Sequence[Tuple[str, str]]): The questions and answers to fold in, oldest first.
+        max_tokens (int): The maximum number of tokens of the summary.
+        model (str): The chat model.
+
+    Returns:
+        str: The updated summary.
+        int: The number of completion tokens used.
+    """
+    transcript = "\n\n".join(
+        f"Question: {question}\nAnswer: {answer}" for question, answer in turns
+    )
+    completion = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": "Update the summary of a conversation about a document with its new turns. Keep the topics, names and page numbers a follow-up question could refer to. Reply with the updated summary only.",
+            },
+            {
+                "role": "user",
+                "content": f"Summary:\n{summary or 'None'}\n\nNew turns:\n{transcript}",
+            },
+        ],
+        max_tokens=max_tokens,
+    )
+    return completion.choices[0].message.content, completion.usage.completion_tokens
+
+
+async def condense_question(
+    *,
+    summary: str,
+    history: Sequence[Tuple[str, str]],
+    question: str,
+    max_tokens: int,
+    model: str,
+) -> Tuple[str, int]:
+    """
+    Rewrites a follow-up question of a conversation as a standalone question, so the
+    chunks it refers to can be searched without the conversation.
+
+    Args:
+        summary (str): The summary of the older turns of the conversation, empty if there is none.
+        history (Sequence[Tuple[str, str]]): The recent questions and answers, oldest first.
+        question (str): The follow-up question.
+        max_tokens (int): The maximum number of tokens of the standalone question.
+        model (str): The chat model.
+
+    Returns:
+        str: The standalone question.
+        int: The number of completion tokens used.
+    """
+    transcript = "\n\n".join(
+        f"Question: {turn_question}\nAnswer: {answer}"
+        for turn_question, answer in history
+    )
+    completion = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": "Rewrite the follow-up question of a conversation about a document as a standalone question, replacing its references to the conversation with what they refer to. Reply with the standalone question only.",
+            },
+            {
+                "role": "user",
+                "content": f"Summary:\n{summary or 'None'}\n\nRecent turns:\n{transcript or 'None'}\n\nFollow-up question: {question}",
+            },
+        ],
+        max_tokens=max_tokens,
+    )
+    return completion.choices[0].message.content, completion.usage.completion_tokens
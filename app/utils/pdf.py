@@ -0,0 +1,268 @@
+"""
+This module provides PDF text extraction that runs outside the event loop.
+Pages are split into ranges which are parsed in parallel by `PDF_POOL_SIZE` worker
+processes, so large documents neither block the server nor run on a single core.
+Workers open the file by path, so the content is never copied between processes.
+Each range runs on a worker of its own, so a parse that times out is stopped by
+terminating that worker alone, since a running parse cannot be cancelled; it is
+replaced by a new worker and the parses of other documents keep running.
+"""
+
+import asyncio
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Any, AsyncIterator, Deque, List, Optional, Tuple
+
+from config import config
+from PyPDF2 import PdfReader
+
+_idle_workers: List[Tuple[BaseProcess, Connection]] = []
+_busy_workers: List[BaseProcess] = []
+_worker_slots: Optional[asyncio.Semaphore] = None
+
+
+def get_pdf_worker_slots() -> asyncio.Semaphore:
+    """
+    Returns the semaphore bounding the number of busy PDF workers to `PDF_POOL_SIZE`,
+    creating it on first use.
+
+    Returns:
+        asyncio.Semaphore: The shared semaphore.
+    """
+    global _worker_slots
+    if _worker_slots is None:
+        _worker_slots = asyncio.Semaphore(config.PDF_POOL_SIZE)
+    return _worker_slots
+
+
+def shutdown_pdf_workers() -> None:
+    """
+    Terminates the PDF workers, stopping the parses they run.
+    """
+    global _worker_slots
+    for process, connection in _idle_workers:
+        process.terminate()
+        connection.close()
+    for process in _busy_workers:
+        process.terminate()
+    _idle_workers.clear()
+    _worker_slots = None
+
+
+def _serve(connection: Connection) -> None:
+    """
+    Runs the functions received through a pipe and sends back their outcome, until
+    the pipe is closed. Runs inside a worker.
+
+    Args:
+        connection (Connection): The worker's end of the pipe.
+    """
+    connection.send(None)
+    while True:
+        try:
+            function, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            outcome = (True, function(*args))
+        except Exception as e:
+            outcome = (False, e)
+        connection.send(outcome)
+
+
+def _receive(connection: Connection, timeout: Optional[float]) -> Optional[Any]:
+    """
+    Waits for a message of a worker. Runs in a thread.
+
+    Args:
+        connection (Connection): The parent's end of the worker's pipe.
+        timeout (Optional[float]): The maximum wait in seconds.
+
+    Returns:
+        Optional[Any]: The message, or None if the worker exited.
+
+    Raises:
+        asyncio.TimeoutError: If nothing is received in time.
+    """
+    if not connection.poll(timeout):
+        raise asyncio.TimeoutError()
+    try:
+        return connection.recv()
+    except EOFError:
+        return None
+
+
+async def _start_worker() -> Tuple[BaseProcess, Connection]:
+    """
+    Starts a PDF worker and waits until it is ready to run functions.
+
+    Returns:
+        Tuple[BaseProcess, Connection]: The worker and the parent's end of its pipe.
+
+    Raises:
+        RuntimeError: If the worker exits while starting.
+    """
+    connection, child_connection = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_serve, args=(child_connection,), daemon=True
+    )
+    process.start()
+    child_connection.close()
+    try:
+        if not await asyncio.to_thread(connection.poll, None):
+            raise RuntimeError("The PDF worker exited while starting")
+        await asyncio.to_thread(connection.recv)
+    except BaseException:
+        process.terminate()
+        connection.close()
+        raise
+    return process, connection
+
+
+def _count_pages(path: str) -> int:
+    """
+    Counts the pages of a PDF. Runs inside a worker.
+
+    Args:
+        path (str): The path of the PDF file.
+
+    Returns:
+        int: The number of pages.
+    """
+    return len(PdfReader(path).pages)
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """
+    Extracts the text of a range of pages. Runs inside a worker.
+
+    Args:
+        path (str): The path of the PDF file.
+        start (int): The index of the first page (inclusive).
+        end (int): The index of the last page (exclusive).
+
+    Returns:
+        List[str]: The text of each page in the range.
+    """
+    reader = PdfReader(path)
+    return [reader.pages[index].extract_text() for index in range(start, end)]
+
+
+async def _run_in_process(function, *args, timeout: Optional[float] = None):
+    """
+    Runs a function on an idle PDF worker once one of `PDF_POOL_SIZE` slots is free,
+    so that the timeout only covers the time spent parsing and not the time queued.
+    The worker is terminated when the function does not return in time or the
+    caller is cancelled, so the parse does not keep a slot busy.
+
+    Args:
+        function (Callable): The picklable function to run.
+        *args: The arguments of the function.
+        timeout (Optional[float]): The maximum run time in seconds (default: None).
+
+    Returns:
+        Any: The result of the function.
+
+    Raises:
+        asyncio.TimeoutError: If the function does not return in time.
+        RuntimeError: If the worker exits without returning.
+    """
+    async with get_pdf_worker_slots():
+        process, connection = (
+            _idle_workers.pop() if _idle_workers else await _start_worker()
+        )
+        _busy_workers.append(process)
+        receiving = None
+        try:
+            connection.send((function, args))
+            receiving = asyncio.ensure_future(
+                asyncio.to_thread(_receive, connection, timeout)
+            )
+            outcome = await asyncio.shield(receiving)
+        except BaseException:
+            process.terminate()
+            await asyncio.to_thread(process.join)
+            # The pipe is closed once the receiving thread saw the worker exit.
+            if receiving is not None:
+                await asyncio.wait([receiving])
+            connection.close()
+            raise
+        finally:
+            _busy_workers.remove(process)
+        if outcome is None:
+            await asyncio.to_thread(process.join)
+            connection.close()
+            raise RuntimeError(
+                f"The PDF worker exited with code {process.exitcode} while parsing"
+            )
+        _idle_workers.append((process, connection))
+    returned, result = outcome
+    if not returned:
+        raise result
+    return result
+
+
+async def count_pages(*, path: str) -> int:
+    """
+    Counts the pages of a PDF in a PDF worker, within `PDF_PAGE_TIMEOUT` seconds.
+
+    Args:
+        path (str): The path of the PDF file.
+
+    Returns:
+        int: The number of pages.
+
+    Raises:
+        asyncio.TimeoutError: If the pages are not counted in time.
+    """
+    return await _run_in_process(_count_pages, path, timeout=config.PDF_PAGE_TIMEOUT)
+
+
+async def iter_text_per_page(
+    *, path: str, page_count: int
+) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Lazily extracts the text of every page of a PDF in the PDF workers. The pages
+    are split into ranges of `PDF_PAGES_PER_SHARD` pages, each parsed within
+    `PDF_PAGE_TIMEOUT` seconds per page. At most `PDF_POOL_SIZE` ranges are parsed
+    ahead of the consumer, so memory stays bounded for any document size.
+
+    Args:
+        path (str): The path of the PDF file.
+        page_count (int): The number of pages of the PDF.
+
+    Yields:
+        Tuple[int, str]: The page number (starting at 1) and the text of each page, in page order.
+
+    Raises:
+        asyncio.TimeoutError: If a page range is not parsed in time.
+    """
+    shard_size = max(1, config.PDF_PAGES_PER_SHARD)
+    starts = iter(range(0, page_count, shard_size))
+    pending: Deque[Tuple[int, asyncio.Future]] = deque()
+    try:
+        while True:
+            while len(pending) < config.PDF_POOL_SIZE and (
+                (start := next(starts, None)) is not None
+            ):
+                end = min(start + shard_size, page_count)
+                task = asyncio.ensure_future(
+                    _run_in_process(
+                        _extract_page_range,
+                        path,
+                        start,
+                        end,
+                        timeout=config.PDF_PAGE_TIMEOUT * (end - start),
+                    )
+                )
+                pending.append((start, task))
+            if not pending:
+                break
+            start, task = pending.popleft()
+            for offset, text in enumerate(await task):
+                yield start + offset + 1, text
+    finally:
+        for _, task in pending:
+            task.cancel()
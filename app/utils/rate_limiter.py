@@ -0,0 +1,190 @@
+"""
+This module provides the concurrency and rate limiting primitives used for OpenAI requests.
+It includes a token bucket for per-minute quotas and a scheduler that keeps a bounded
+number of embedding requests in flight and backs off adaptively on rate limit errors,
+and exponentially on transient connection and server errors.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from .logging import logger
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously up to a per-minute capacity.
+
+    Attributes:
+        capacity (float): The maximum number of tokens, equal to the per-minute rate.
+        tokens (float): The number of tokens currently available.
+    """
+
+    def __init__(self, *, rate_per_minute: float):
+        """
+        Initializes a full bucket with the given per-minute rate.
+
+        Args:
+            rate_per_minute (float): The number of tokens replenished every minute.
+        """
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self._fill_rate = self.capacity / 60
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """
+        Adds the tokens accumulated since the last refill.
+        """
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self._fill_rate
+        )
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Waits until the requested amount of tokens is available and takes it.
+        Requests larger than the capacity are capped so they can still proceed.
+
+        Args:
+            amount (float): The number of tokens to take (default: 1).
+        """
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self._fill_rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class EmbeddingScheduler:
+    """
+    Runs embedding requests concurrently within the provider quota.
+
+    Requests wait for a concurrency slot and for the requests-per-minute and
+    tokens-per-minute buckets. A rate limit error pauses every request for the
+    `Retry-After` delay (or an exponential backoff), halves the concurrency limit
+    and retries; the limit grows back by one slot after each successful request.
+    A connection error, timeout or server error only backs off the failed request,
+    exponentially, before it is retried.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_retries: int = 5,
+    ):
+        """
+        Initializes the scheduler with its concurrency and quota limits.
+
+        Args:
+            max_concurrency (int): The maximum number of requests in flight.
+            requests_per_minute (float): The requests-per-minute quota.
+            tokens_per_minute (float): The tokens-per-minute quota.
+            max_retries (int): The number of retries after rate limit, connection and server errors (default: 5).
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = self.max_concurrency
+        self.max_retries = max_retries
+        self.request_bucket = TokenBucket(rate_per_minute=requests_per_minute)
+        self.token_bucket = TokenBucket(rate_per_minute=tokens_per_minute)
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._condition = asyncio.Condition()
+
+    @staticmethod
+    def _retry_after(exc: RateLimitError) -> Optional[float]:
+        """
+        Reads the delay requested by the provider from the error response headers.
+
+        Args:
+            exc (RateLimitError): The rate limit error.
+
+        Returns:
+            Optional[float]: The delay in seconds, or None if no header was sent.
+        """
+        headers = exc.response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+
+    async def _acquire_slot(self) -> None:
+        """
+        Waits for a free concurrency slot under the current adaptive limit.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.concurrency)
+            self._in_flight += 1
+
+    async def _release_slot(self, *, throttled: bool) -> None:
+        """
+        Frees a concurrency slot and adapts the concurrency limit.
+
+        Args:
+            throttled (bool): Whether the request was rejected with a rate limit error.
+        """
+        async with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self.concurrency = max(1, self.concurrency // 2)
+            elif self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+            self._condition.notify_all()
+
+    async def submit(self, *, request: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """
+        Runs a request once a slot and enough quota are available,
+        retrying it after rate limit, connection and server errors.
+
+        Args:
+            request (Callable[[], Awaitable[T]]): A factory for the request coroutine.
+            tokens (int): The estimated number of tokens the request consumes.
+
+        Returns:
+            T: The result of the request.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._acquire_slot()
+            throttled, backoff = False, 0
+            try:
+                delay = self._resume_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.request_bucket.acquire()
+                await self.token_bucket.acquire(tokens)
+                return await request()
+            except RateLimitError as exc:
+                if attempt == self.max_retries:
+                    raise
+                throttled = True
+                delay = self._retry_after(exc) or min(2**attempt, 60)
+                self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                logger.warning(
+                    f"Embedding request rate limited, retrying in {delay} seconds ..."
+                )
+            except (APIConnectionError, InternalServerError) as exc:
+                if attempt == self.max_retries:
+                    raise
+                backoff = min(2**attempt, 60)
+                logger.warning(
+                    f"Embedding request failed ({exc!r}), retrying in {backoff} seconds ..."
+                )
+            finally:
+                await self._release_slot(throttled=throttled)
+            await asyncio.sleep(backoff)
@@ -0,0 +1,46 @@
+"""
+This module provides a lightweight, offline token estimator.
+It is used to size embedding batches and to fit the context of a question
+in the model's context window without calling the OpenAI API.
+"""
+
+import math
+from typing import List
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in a text using the average characters per token
+    of OpenAI's tokenizers for English text.
+
+    Args:
+        text (str): The text to estimate.
+
+    Returns:
+        int: The estimated number of tokens, at least 1.
+    """
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def pack_texts(texts: List[str], budget: int, separator: str = "\n\n") -> List[str]:
+    """
+    Greedily selects texts, in order, while their estimated tokens fit in a budget.
+    A text that does not fit is skipped, so a shorter one after it can still be selected.
+
+    Args:
+        texts (List[str]): The texts, most relevant first.
+        budget (int): The number of tokens available.
+        separator (str): The separator the selected texts are joined with (default: a blank line).
+
+    Returns:
+        List[str]: The selected texts, in input order.
+    """
+    packed, used = [], 0
+    for text in texts:
+        tokens = estimate_tokens(text) + (estimate_tokens(separator) if packed else 0)
+        if used + tokens <= budget:
+            packed.append(text)
+            used += tokens
+    return packed
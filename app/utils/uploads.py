@@ -0,0 +1,50 @@
+"""
+This module provides a utility function to spool uploaded files to disk.
+The upload is streamed in fixed-size blocks and hashed on the way, so the
+whole file never has to be held in memory.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Optional, Tuple
+
+from fastapi import UploadFile
+
+SPOOL_BLOCK_SIZE = 1024 * 1024
+
+
+async def spool_upload(
+    *, file: UploadFile, directory: Optional[str] = None, suffix: str = ".pdf"
+) -> Tuple[str, str, int]:
+    """
+    Streams an uploaded file into a temporary file while computing its md5.
+    The temporary file is removed if the upload cannot be read or written.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        directory (Optional[str]): The directory of the temporary file (default: system temp directory).
+        suffix (str): The suffix of the temporary file (default: ".pdf").
+
+    Returns:
+        str: The path of the temporary file. The caller is responsible for removing it.
+        str: The md5 hex digest of the file content.
+        int: The size of the file in bytes.
+    """
+    md5 = hashlib.md5()
+    size = 0
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=directory, suffix=suffix, delete=False
+    ) as spool:
+        try:
+            while block := await file.read(SPOOL_BLOCK_SIZE):
+                md5.update(block)
+                spool.write(block)
+                size += len(block)
+        except BaseException:
+            spool.close()
+            os.remove(spool.name)
+            raise
+    return spool.name, md5.hexdigest(), size
@@ -0,0 +1,127 @@
+"""
+This module provides in-memory cosine similarity search with NumPy.
+Embeddings are stored as a contiguous matrix of unit-length rows, so the
+similarity of a query to every row is a single matrix-vector product. The matrix
+can be stored in full precision, in half precision, as int8 or as sign bits,
+trading accuracy for memory; compressed matrices are meant for a coarse search
+whose candidates are re-ranked with the full-precision embeddings. Candidates can
+be diversified with maximal marginal relevance.
+"""
+
+from typing import Any, Sequence, Tuple
+
+import numpy as np
+
+STORAGE_MODES = ("full", "half", "int8", "binary")
+SCORE_BLOCK_ROWS = 4096
+
+
+def build_matrix(vectors: Sequence[Any], storage: str = "full") -> np.ndarray:
+    """
+    Stacks embeddings into a contiguous matrix with unit-length rows.
+
+    Args:
+        vectors (Sequence[Any]): The embeddings, as lists or numpy arrays of the same dimension.
+        storage (str): One of `STORAGE_MODES`: float32, float16, int8 scaled by the
+            largest component, or the sign bits of each component packed into bytes (default: "full").
+
+    Returns:
+        np.ndarray: The normalized matrix, one row per embedding.
+    """
+    matrix = np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    matrix /= norms
+    if storage == "half":
+        return matrix.astype(np.float16)
+    if storage == "int8":
+        scale = 127 / (np.abs(matrix).max() or 1)
+        return np.round(matrix * scale).astype(np.int8)
+    if storage == "binary":
+        return np.packbits(matrix > 0, axis=1)
+    return matrix
+
+
+def score(matrix: np.ndarray, query: Sequence[float]) -> np.ndarray:
+    """
+    Scores every row of a matrix built by `build_matrix` against a query.
+    Compressed rows are widened to float32 block by block, and sign bits
+    are compared by Hamming distance.
+
+    Args:
+        matrix (np.ndarray): The matrix built by `build_matrix`.
+        query (Sequence[float]): The query embedding.
+
+    Returns:
+        np.ndarray: The score of each row, higher is more similar.
+    """
+    query = np.asarray(query, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1)
+    if matrix.dtype == np.uint8:
+        differing = np.bitwise_count(matrix ^ np.packbits(query > 0))
+        return -differing.sum(axis=1, dtype=np.int32)
+    if matrix.dtype == np.float32:
+        return matrix @ query
+    scores = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+        block = matrix[start : start + SCORE_BLOCK_ROWS]
+        scores[start : start + SCORE_BLOCK_ROWS] = block.astype(np.float32) @ query
+    return scores
+
+
+def top_k(
+    matrix: np.ndarray, query: Sequence[float], k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the rows of a normalized matrix most similar to a query.
+
+    Args:
+        matrix (np.ndarray): The matrix built by `build_matrix`.
+        query (Sequence[float]): The query embedding.
+        k (int): The number of rows to return.
+
+    Returns:
+        np.ndarray: The indices of the most similar rows, most similar first.
+        np.ndarray: The score of each returned row.
+    """
+    scores = score(matrix, query)
+    if k < len(scores):
+        indices = np.argpartition(-scores, k - 1)[:k]
+        indices = indices[np.argsort(-scores[indices], kind="stable")]
+    else:
+        indices = np.argsort(-scores, kind="stable")
+    return indices, scores[indices]
+
+
+def mmr(
+    matrix: np.ndarray, query: Sequence[float], k: int, lambda_mult: float
+) -> np.ndarray:
+    """
+    Selects rows by maximal marginal relevance: each pick maximizes
+    `lambda_mult` * similarity to the query - (1 - `lambda_mult`) * highest
+    similarity to the rows already picked. The pairwise similarities are
+    computed once, and each pick updates the redundancy of every row at once.
+
+    Args:
+        matrix (np.ndarray): The candidate rows, a float32 matrix built by `build_matrix`.
+        query (Sequence[float]): The query embedding.
+        k (int): The number of rows to select.
+        lambda_mult (float): The weight of relevance against diversity, between 0 and 1.
+
+    Returns:
+        np.ndarray: The indices of the selected rows, in selection order.
+    """
+    k = min(k, len(matrix))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    relevance = score(matrix, query)
+    similarity = matrix @ matrix.T
+    selected = np.empty(k, dtype=np.intp)
+    selected[0] = np.argmax(relevance)
+    redundancy = similarity[selected[0]].copy()
+    for position in range(1, k):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected[:position]] = -np.inf
+        selected[position] = np.argmax(scores)
+        np.maximum(redundancy, similarity[selected[position]], out=redundancy)
+    return selected
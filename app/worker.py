@@ -0,0 +1,147 @@
+"""
+This module runs the ingestion workers. Each worker claims queued jobs from the
+`ingestion_jobs` table and processes them one at a time. Workers run inside the
+API process (see `INGESTION_WORKERS`) or as a standalone process, so ingestion
+capacity can be scaled separately from the API. On startup, and whenever a worker
+finds the queue empty, jobs abandoned by a stopped worker are queued again and
+resume from their last checkpoint. Every `EMBEDDING_CACHE_PRUNE_INTERVAL` seconds,
+a worker also prunes the embedding cache table if it outgrew its bound:
+
+    python app/worker.py
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from api.v1.document.controller import DocumentController
+from config import config
+from crud import EmbeddingCacheCrud, IngestionJobCrud
+from utils import logger, shutdown_pdf_workers
+from utils.session import async_session_factory
+
+
+async def process_next_job() -> bool:
+    """
+    Claims and processes the oldest pending ingestion job.
+
+    Returns:
+        bool: True if a job was processed, False if the queue was empty.
+    """
+    async with async_session_factory() as session:
+        job = await IngestionJobCrud().claim_next(session=session)
+        if not job:
+            return False
+        logger.info(f"Processing ingestion job {job.id} ...")
+        await DocumentController().process_ingestion_job(session=session, job=job)
+        return True
+
+
+async def resume_stalled_jobs() -> int:
+    """
+    Queues again the jobs that have been PROCESSING without a checkpoint for
+    `INGESTION_STALL_TIMEOUT` seconds.
+
+    Returns:
+        int: The number of resumed jobs.
+    """
+    async with async_session_factory() as session:
+        count = await IngestionJobCrud().requeue_stalled(
+            session=session, stalled_after=config.INGESTION_STALL_TIMEOUT
+        )
+    if count:
+        logger.info(f"Resuming {count} stalled ingestion jobs ...")
+    return count
+
+
+async def prune_embedding_cache() -> int:
+    """
+    Deletes the least recently used embeddings beyond `EMBEDDING_CACHE_MAX_ROWS`.
+
+    Returns:
+        int: The number of deleted embeddings.
+    """
+    async with async_session_factory() as session:
+        count = await EmbeddingCacheCrud().prune(
+            session=session, max_rows=config.EMBEDDING_CACHE_MAX_ROWS
+        )
+    if count:
+        logger.info(f"Pruned {count} embeddings from the embedding cache ...")
+    return count
+
+
+async def run_worker(*, stop: asyncio.Event) -> None:
+    """
+    Processes ingestion jobs until the stop event is set. Whenever the queue is empty,
+    the worker queues again the stalled jobs of other workers, which it processes
+    next, and otherwise waits `INGESTION_POLL_INTERVAL` seconds. Between jobs, the
+    embedding cache is pruned every `EMBEDDING_CACHE_PRUNE_INTERVAL` seconds.
+
+    Args:
+        stop (asyncio.Event): The event that stops the worker.
+    """
+    next_prune = time.monotonic()
+    while not stop.is_set():
+        if time.monotonic() >= next_prune:
+            next_prune = time.monotonic() + config.EMBEDDING_CACHE_PRUNE_INTERVAL
+            try:
+                await prune_embedding_cache()
+            except Exception as exc:
+                logger.error(f"Could not prune the embedding cache: {exc!r}")
+        try:
+            processed = await process_next_job()
+        except Exception as exc:
+            logger.error(f"Ingestion worker error: {exc!r}")
+            processed = False
+        if not processed:
+            try:
+                if await resume_stalled_jobs():
+                    continue
+            except Exception as exc:
+                logger.error(f"Could not resume stalled ingestion jobs: {exc!r}")
+            try:
+                await asyncio.wait_for(
+                    stop.wait(), timeout=config.INGESTION_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+
+@asynccontextmanager
+async def ingestion_workers(*, count: int) -> AsyncIterator[None]:
+    """
+    Runs ingestion workers for the duration of the context, after resuming
+    stalled jobs. On exit, the workers finish the job in progress and stop.
+
+    Args:
+        count (int): The number of workers.
+    """
+    try:
+        await resume_stalled_jobs()
+    except Exception as exc:
+        logger.error(f"Could not resume stalled ingestion jobs: {exc!r}")
+    stop = asyncio.Event()
+    workers = [asyncio.create_task(run_worker(stop=stop)) for _ in range(count)]
+    try:
+        yield
+    finally:
+        stop.set()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def main() -> None:
+    """
+    Runs `INGESTION_WORKERS` workers (at least one) until interrupted.
+    """
+    async with ingestion_workers(count=max(1, config.INGESTION_WORKERS)):
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_pdf_workers()
@@ -1,6 +1,9 @@
 import os
+import re
+import sys
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config
+from sqlalchemy import Column
 from sqlalchemy import pool
 from dotenv import load_dotenv
 from alembic import context
@@ -15,9 +18,24 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# The models read their settings from the app's config, imported like the app does.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
 from app.models import Base
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Skip the partitions of partitioned tables, which are created by DDL events of their parent,
+    and expression indexes, which autogenerate cannot compare and are written by hand.
+    """
+    if type_ == "table" and compare_to is None and re.fullmatch(r"\w+_p\d+", name):
+        return False
+    if type_ == "index" and not all(isinstance(expression, Column) for expression in object.expressions):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("SQLALCHEMY_DATABASE_URL")
@@ -42,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         version_table_schema="public",
         include_schemas=True,
         literal_binds=True,
@@ -67,7 +86,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,90 @@
+"""list partition document chunks by document
+
+Revision ID: 4d8b2f6a1c93
+Revises: 9a3f7c2e5d41
+Create Date: 2026-10-17 23:48:09.215376
+
+"""
+from typing import Sequence, Union
+
+import pgvector
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8b2f6a1c93'
+down_revision: Union[str, None] = '9a3f7c2e5d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_COUNT = 16
+COLUMNS = 'id, document_id, content, embedding, page_number, page_end, chunk_index, metadata_info, is_deleted, created_at, updated_at'
+
+
+def _create_document_chunks(partition_by: str) -> None:
+    """Creates the document_chunks table with the given partitioning."""
+    op.create_table('document_chunks',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(), nullable=True),
+    sa.Column('page_number', sa.Integer(), nullable=True),
+    sa.Column('page_end', sa.Integer(), nullable=True),
+    sa.Column('chunk_index', sa.Integer(), nullable=True),
+    sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('english'::regconfig, (content)::text)", persisted=True), nullable=True),
+    sa.Column('metadata_info', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.PrimaryKeyConstraint('id', 'document_id'),
+    postgresql_partition_by=partition_by
+    )
+
+
+def _rebuild_document_chunks(partitioned_by_document: bool) -> None:
+    """Moves the chunks into a new document_chunks table and recreates its indexes as they were."""
+    bind = op.get_bind()
+    indexes = bind.execute(sa.text(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE tablename = 'document_chunks' AND indexname <> 'document_chunks_pkey'"
+    )).all()
+    partitions = bind.execute(sa.text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'document_chunks'::regclass"
+    )).scalars().all()
+    for name, _ in indexes:
+        op.drop_index(name, table_name='document_chunks')
+    op.rename_table('document_chunks', 'document_chunks_old')
+    for partition in partitions:
+        op.rename_table(partition, partition.replace('document_chunks', 'document_chunks_old', 1))
+    op.execute('ALTER INDEX document_chunks_pkey RENAME TO document_chunks_old_pkey')
+    op.execute('ALTER SEQUENCE document_chunks_id_seq RENAME TO document_chunks_old_id_seq')
+    if partitioned_by_document:
+        _create_document_chunks('LIST (document_id)')
+        document_ids = bind.execute(sa.text('SELECT DISTINCT document_id FROM document_chunks_old')).scalars().all()
+        for document_id in document_ids:
+            op.execute(f'CREATE TABLE document_chunks_p{document_id} PARTITION OF document_chunks FOR VALUES IN ({document_id})')
+    else:
+        _create_document_chunks('HASH (document_id)')
+        for remainder in range(PARTITION_COUNT):
+            op.execute(
+                f'CREATE TABLE document_chunks_p{remainder} PARTITION OF document_chunks '
+                f'FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder})'
+            )
+    op.execute(f'INSERT INTO document_chunks ({COLUMNS}) SELECT {COLUMNS} FROM document_chunks_old')
+    op.execute("SELECT setval('document_chunks_id_seq', (SELECT COALESCE(MAX(id), 0) + 1 FROM document_chunks), false)")
+    op.drop_table('document_chunks_old')
+    for _, definition in indexes:
+        op.execute(definition.replace(' ON ONLY ', ' ON '))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Each document gets its own partition, so a per-document search only reads that document's chunks.
+    _rebuild_document_chunks(partitioned_by_document=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild_document_chunks(partitioned_by_document=False)
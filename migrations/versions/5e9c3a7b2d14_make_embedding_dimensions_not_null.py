@@ -0,0 +1,36 @@
+"""make embedding dimensions not null
+
+Revision ID: 5e9c3a7b2d14
+Revises: 4d8b2f6a1c93
+Create Date: 2026-10-17 09:12:37.504183
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9c3a7b2d14'
+down_revision: Union[str, None] = '4d8b2f6a1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Documents created before the column existed were embedded with 1536 dimensions.
+    op.execute('UPDATE documents SET embedding_dimensions = 1536 WHERE embedding_dimensions IS NULL')
+    op.alter_column('documents', 'embedding_dimensions',
+               existing_type=sa.INTEGER(),
+               server_default='1536',
+               nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('documents', 'embedding_dimensions',
+               existing_type=sa.INTEGER(),
+               server_default=None,
+               nullable=True)
@@ -0,0 +1,32 @@
+"""add last used at to embedding cache
+
+Revision ID: 8e2b6d4f1a57
+Revises: 5e9c3a7b2d14
+Create Date: 2026-10-17 09:41:18.662930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2b6d4f1a57'
+down_revision: Union[str, None] = '5e9c3a7b2d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embedding_cache', sa.Column('last_used_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.execute('UPDATE embedding_cache SET last_used_at = updated_at')
+    op.alter_column('embedding_cache', 'last_used_at', nullable=False)
+    op.create_index(op.f('ix_embedding_cache_last_used_at'), 'embedding_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_embedding_cache_last_used_at'), table_name='embedding_cache')
+    op.drop_column('embedding_cache', 'last_used_at')
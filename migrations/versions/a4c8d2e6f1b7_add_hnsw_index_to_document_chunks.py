@@ -0,0 +1,48 @@
+"""add hnsw index to document chunks
+
+Revision ID: a4c8d2e6f1b7
+Revises: 7f1e9b3a6d20
+Create Date: 2026-10-17 14:08:31.672405
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8d2e6f1b7'
+down_revision: Union[str, None] = '7f1e9b3a6d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The index is built concurrently so ingestion and chat keep running during the build.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_document_chunks_embedding_hnsw',
+            'document_chunks',
+            ['embedding'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_with={
+                'm': int(os.getenv('HNSW_M', 16)),
+                'ef_construction': int(os.getenv('HNSW_EF_CONSTRUCTION', 64)),
+            },
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_document_chunks_embedding_hnsw',
+            table_name='document_chunks',
+            postgresql_concurrently=True,
+        )
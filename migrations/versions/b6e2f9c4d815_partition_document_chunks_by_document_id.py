@@ -0,0 +1,76 @@
+"""partition document chunks by document id
+
+Revision ID: b6e2f9c4d815
+Revises: a4c8d2e6f1b7
+Create Date: 2026-10-17 15:21:46.208713
+
+"""
+import os
+from typing import Sequence, Union
+
+import pgvector
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2f9c4d815'
+down_revision: Union[str, None] = 'a4c8d2e6f1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_COUNT = 16
+COLUMNS = 'id, document_id, content, embedding, page_number, page_end, chunk_index, metadata_info, is_deleted, created_at, updated_at'
+
+
+def _create_document_chunks(*primary_key: str, **kwargs) -> None:
+    """Creates the document_chunks table with the given primary key."""
+    op.create_table('document_chunks',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('embedding', pgvector.sqlalchemy.vector.VECTOR(dim=1536), nullable=True),
+    sa.Column('page_number', sa.Integer(), nullable=True),
+    sa.Column('page_end', sa.Integer(), nullable=True),
+    sa.Column('chunk_index', sa.Integer(), nullable=True),
+    sa.Column('metadata_info', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.PrimaryKeyConstraint(*primary_key),
+    **kwargs
+    )
+
+
+def _rebuild_document_chunks(*primary_key: str, partitioned: bool) -> None:
+    """Moves the chunks into a new document_chunks table and rebuilds its indexes."""
+    op.drop_index('ix_document_chunks_embedding_hnsw', table_name='document_chunks')
+    op.drop_index('ix_document_chunks_document_id_chunk_index', table_name='document_chunks')
+    op.rename_table('document_chunks', 'document_chunks_old')
+    op.execute('ALTER INDEX document_chunks_pkey RENAME TO document_chunks_old_pkey')
+    op.execute('ALTER SEQUENCE document_chunks_id_seq RENAME TO document_chunks_old_id_seq')
+    if partitioned:
+        _create_document_chunks(*primary_key, postgresql_partition_by='HASH (document_id)')
+        for remainder in range(PARTITION_COUNT):
+            op.execute(
+                f'CREATE TABLE document_chunks_p{remainder} PARTITION OF document_chunks '
+                f'FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder})'
+            )
+    else:
+        _create_document_chunks(*primary_key)
+    op.execute(f'INSERT INTO document_chunks ({COLUMNS}) SELECT {COLUMNS} FROM document_chunks_old')
+    op.execute("SELECT setval('document_chunks_id_seq', (SELECT COALESCE(MAX(id), 0) + 1 FROM document_chunks), false)")
+    op.drop_table('document_chunks_old')
+    op.create_index('ix_document_chunks_document_id_chunk_index', 'document_chunks', ['document_id', 'chunk_index'], unique=True)
+    op.create_index('ix_document_chunks_embedding_hnsw', 'document_chunks', ['embedding'], unique=False, postgresql_using='hnsw', postgresql_ops={'embedding': 'vector_cosine_ops'}, postgresql_with={'m': int(os.getenv('HNSW_M', 16)), 'ef_construction': int(os.getenv('HNSW_EF_CONSTRUCTION', 64))})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rebuild_document_chunks('id', 'document_id', partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild_document_chunks('id', partitioned=False)
@@ -0,0 +1,55 @@
+"""add quantized embedding index
+
+Revision ID: d2a7c5e8b391
+Revises: b6e2f9c4d815
+Create Date: 2026-10-17 16:37:12.580934
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c5e8b391'
+down_revision: Union[str, None] = 'b6e2f9c4d815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+QUANTIZED_INDEXES = {
+    'half': ('ix_document_chunks_embedding_halfvec_hnsw', '(embedding::halfvec(1536)) halfvec_cosine_ops'),
+    'binary': ('ix_document_chunks_embedding_bit_hnsw', '(binary_quantize(embedding)::bit(1536)) bit_hamming_ops'),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The index follows EMBEDDING_STORAGE and needs halfvec and binary_quantize (pgvector 0.7+).
+    # It replaces the full-precision index: candidates are re-ranked from the table's embeddings.
+    storage = os.getenv('EMBEDDING_STORAGE', 'full')
+    if storage not in QUANTIZED_INDEXES:
+        return
+    version = op.get_bind().execute(sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    if tuple(int(part) for part in version.split('.')[:2]) < (0, 7):
+        raise RuntimeError(f'EMBEDDING_STORAGE={storage} needs pgvector 0.7 or later, found {version}')
+    name, expression = QUANTIZED_INDEXES[storage]
+    op.drop_index('ix_document_chunks_embedding_hnsw', table_name='document_chunks')
+    op.execute(
+        f'CREATE INDEX {name} ON document_chunks USING hnsw ({expression}) '
+        f"WITH (m = {int(os.getenv('HNSW_M', 16))}, ef_construction = {int(os.getenv('HNSW_EF_CONSTRUCTION', 64))})"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    names = op.get_bind().execute(sa.text("SELECT indexname FROM pg_indexes WHERE tablename = 'document_chunks'")).scalars().all()
+    if 'ix_document_chunks_embedding_hnsw' in names:
+        return
+    for name, _ in QUANTIZED_INDEXES.values():
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute(
+        'CREATE INDEX ix_document_chunks_embedding_hnsw ON document_chunks USING hnsw (embedding vector_cosine_ops) '
+        f"WITH (m = {int(os.getenv('HNSW_M', 16))}, ef_construction = {int(os.getenv('HNSW_EF_CONSTRUCTION', 64))})"
+    )
@@ -21,6 +21,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../a
 
 from app.models import Base
 from app.main import app
+from app.worker import process_next_job
 
 load_dotenv()
 
@@ -162,3 +163,23 @@ def chat_payload():
         "model": "gpt-4-turbo",
         "max_tokens": 300,
     }
+
+
+
+@pytest.fixture
+async def ready_session(app_client: AsyncClient, sample_pdf, session_payload: dict) -> int:
+    """
+    Ingests the sample PDF, processes its ingestion job and creates a chat session on it.
+
+    Returns:
+        int: The ID of the chat session.
+    """
+    files = {"new_file": ("wikipedia-4.pdf", sample_pdf, "application/pdf")}
+    response = await app_client.post("/v1/document/ingest", files=files)
+    assert response.status_code in (200, 202)
+    while await process_next_job():
+        pass
+    session_payload.update({"document_id": response.json()["details"]["id"]})
+    response = await app_client.post("/v1/session/", json=session_payload)
+    assert response.status_code == 200
+    return response.json()["details"]["session_id"]
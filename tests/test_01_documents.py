@@ -3,11 +3,18 @@ This module contains test cases for the `/v1/document/` API endpoints.
 It includes tests for scenarios where no documents exist and when documents are present in the database.
 """
 
+from datetime import datetime, timezone
+
 import pytest
 from fastapi import status
 from sqlalchemy.ext.asyncio import AsyncSession
 from httpx import AsyncClient
 from app.models import Documents
+from app.worker import process_next_job
+from config import config
+from crud import EmbeddingCacheCrud, IngestionJobCrud
+from sqlalchemy import func, select, text
+from app.models import EmbeddingCache
 
 
 @pytest.mark.asyncio
@@ -57,13 +64,70 @@ async def test_ingest_document(app_client: AsyncClient, sample_pdf):
     """
     files = {"new_file": ("wikipedia-4.pdf", sample_pdf, "application/pdf")}
     response = await app_client.post("/v1/document/ingest", files=files)
-    assert response.status_code == status.HTTP_200_OK
+    assert response.status_code == status.HTTP_202_ACCEPTED
     assert "size" in response.json()["details"]["metadata_info"]
     assert "pages" in response.json()["details"]["metadata_info"]
     assert "md5" in response.json()["details"]["metadata_info"]
     assert response.json()["details"]["filename"] == "wikipedia-4.pdf"
+    assert response.json()["details"]["status"] == "PENDING"
+    assert response.json()["message"] == "Document queued for ingestion."
+
+
+@pytest.mark.asyncio
+async def test_ingest_document_status(app_client: AsyncClient, sample_pdf):
+    """
+    Test the GET /v1/document/{document_id}/status endpoint before and after
+    the ingestion job is processed.
+    """
+    files = {"new_file": ("wikipedia-4.pdf", sample_pdf, "application/pdf")}
+    response = await app_client.post("/v1/document/ingest", files=files)
+    document_id = response.json()["details"]["id"]
+
+    response = await app_client.get(f"/v1/document/{document_id}/status")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["details"]["status"] == "PENDING"
+
+    while await process_next_job():
+        pass
+    response = await app_client.get(f"/v1/document/{document_id}/status")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["details"]["status"] == "COMPLETED"
+    assert response.json()["details"]["usage"] is not None
+
+
+@pytest.mark.asyncio
+async def test_ingest_document_duplicate(app_client: AsyncClient, sample_pdf):
+    """
+    Test the POST /v1/document/ingest endpoint with a file that was already ingested.
+    The stored chunks are reused and the document is completed without a job.
+    """
+    content = sample_pdf.getvalue() + b"\n% duplicate\n"
+    files = {"new_file": ("duplicate.pdf", content, "application/pdf")}
+    response = await app_client.post("/v1/document/ingest", files=files)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    while await process_next_job():
+        pass
+
+    response = await app_client.post("/v1/document/ingest", files=files)
+    assert response.status_code == status.HTTP_200_OK
     assert response.json()["message"] == "Document ingested successfully."
-    
+    assert response.json()["details"]["status"] == "COMPLETED"
+    document_id = response.json()["details"]["id"]
+
+    response = await app_client.get(f"/v1/document/{document_id}/status")
+    assert response.json()["details"]["status"] == "COMPLETED"
+    assert response.json()["details"]["usage"] == 0
+
+
+@pytest.mark.asyncio
+async def test_ingest_document_status_not_found(app_client: AsyncClient):
+    """
+    Test the GET /v1/document/{document_id}/status endpoint for a missing document.
+    """
+    response = await app_client.get("/v1/document/1000/status")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["message"] == "Document with ID 1000 not found"
+
 
 @pytest.mark.asyncio
 async def test_ingest_document_not_pdf(app_client: AsyncClient, sample_pdf):
@@ -74,3 +138,49 @@ async def test_ingest_document_not_pdf(app_client: AsyncClient, sample_pdf):
     response = await app_client.post("/v1/document/ingest", files=files)
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert response.json()["message"] == "Only PDF file is accepted."
+
+
+@pytest.mark.asyncio
+async def test_ingest_document_removes_spool(
+    app_client: AsyncClient, sample_pdf, monkeypatch, tmp_path
+):
+    """
+    Test that the spooled upload is removed when the ingestion job cannot be created.
+    A comment is appended to the file, so its content is not a duplicate.
+    """
+    async def fail(*args, **kwargs):
+        raise RuntimeError("job not created")
+
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(IngestionJobCrud, "create", fail)
+    content = sample_pdf.getvalue() + b"\n% spooled\n"
+    files = {"new_file": ("spooled.pdf", content, "application/pdf")}
+    with pytest.raises(RuntimeError):
+        await app_client.post("/v1/document/ingest", files=files)
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_prune_embedding_cache(db_session: AsyncSession):
+    """
+    Test that pruning the embedding cache deletes the least recently used entries beyond its bound,
+    even when they were last used at the same time.
+    """
+    kept = await db_session.scalar(select(func.count()).select_from(EmbeddingCache))
+    for index in range(3):
+        db_session.add(
+            EmbeddingCache(
+                model="text-embedding-3-small",
+                dimensions=4,
+                text_hash=f"{index:064d}",
+                embedding=[1.0, 0.0, 0.0, 0.0],
+                last_used_at=datetime(2000, 1, 1, tzinfo=timezone.utc),
+            )
+        )
+    await db_session.commit()
+    await db_session.execute(text("ANALYZE embedding_cache"))
+
+    assert await EmbeddingCacheCrud().prune(session=db_session, max_rows=kept + 1) == 2
+    assert await db_session.scalar(select(func.count()).select_from(EmbeddingCache)) == kept + 1
+    assert await EmbeddingCacheCrud().prune(session=db_session, max_rows=kept) == 1
+    assert await EmbeddingCacheCrud().prune(session=db_session, max_rows=kept) == 0
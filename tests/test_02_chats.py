@@ -1,8 +1,13 @@
+import asyncio
+
 import pytest
 from fastapi import status
 from sqlalchemy.ext.asyncio import AsyncSession
 from httpx import AsyncClient
-from app.models import Documents
+from sqlalchemy import select
+from app.models import ChatSessions, Documents
+from app.worker import process_next_job
+from crud import EmbeddingCacheCrud
 
 
 @pytest.mark.asyncio
@@ -72,6 +77,45 @@ async def test_chat_wrong_payload(
     assert response.json()["message"] == "question field required"
 
 
+@pytest.mark.asyncio
+async def test_chat_wrong_search_mode(
+    app_client: AsyncClient, chat_payload: dict
+):
+    """
+    Test the POST /v1/session/{session_id} endpoint with an unknown search mode.
+    """
+    chat_payload["search_mode"] = "keyword"
+    response = await app_client.post("/v1/session/1", json=chat_payload)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["message"] == "search_mode input should be 'vector', 'lexical' or 'hybrid'"
+
+
+@pytest.mark.asyncio
+async def test_chat_wrong_k(
+    app_client: AsyncClient, chat_payload: dict
+):
+    """
+    Test the POST /v1/session/{session_id} endpoint with no chunks requested.
+    """
+    chat_payload["k"] = 0
+    response = await app_client.post("/v1/session/1", json=chat_payload)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["message"] == "k input should be greater than or equal to 1"
+
+
+@pytest.mark.asyncio
+async def test_chat_wrong_compression_ratio(
+    app_client: AsyncClient, chat_payload: dict
+):
+    """
+    Test the POST /v1/session/{session_id} endpoint with a compression ratio keeping nothing.
+    """
+    chat_payload["compression_ratio"] = 0
+    response = await app_client.post("/v1/session/1", json=chat_payload)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["message"] == "compression_ratio input should be greater than 0"
+
+
 @pytest.mark.asyncio
 async def test_chat_no_session(
     app_client: AsyncClient, chat_payload: dict
@@ -105,8 +149,10 @@ async def test_chat_successful(
     """
     files = {"new_file": ("wikipedia-4.pdf", sample_pdf, "application/pdf")}
     response = await app_client.post("/v1/document/ingest", files=files)
-    assert response.status_code == status.HTTP_200_OK
+    assert response.status_code in (status.HTTP_200_OK, status.HTTP_202_ACCEPTED)
     ingest_data = response.json()["details"]
+    while await process_next_job():
+        pass
 
     session_payload.update({"document_id": ingest_data["id"]})
     response = await app_client.post("/v1/session/", json=session_payload)
@@ -116,3 +162,234 @@ async def test_chat_successful(
     response = await app_client.post(f"/v1/session/{session_data["session_id"]}", json=chat_payload)
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["message"] == "Question answered successfully."
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_session_invalid(
+    app_client: AsyncClient, chat_payload: dict
+):
+    """
+    Test the POST /v1/session/{session_id}/batch endpoint with an unknown session_id.
+    """
+    batch_payload = {"questions": [chat_payload["question"]]}
+    response = await app_client.post("/v1/session/100/batch", json=batch_payload)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["message"] == "Session not found."
+
+
+@pytest.mark.asyncio
+async def test_chat_batch_successful(
+    app_client: AsyncClient, chat_payload: dict, ready_session: int):
+    """
+    Test the POST /v1/session/{session_id}/batch endpoint.
+    Ask several questions at once in a session on an ingested file.
+    """
+    batch_payload = {
+        "questions": [chat_payload["question"], "Who wrote the file?"],
+        "model": chat_payload["model"],
+    }
+    response = await app_client.post(f"/v1/session/{ready_session}/batch", json=batch_payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message"] == "Questions answered successfully."
+    chats = response.json()["details"]["chats"]
+    assert [chat["question"] for chat in chats] == batch_payload["questions"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search_mode", ["lexical", "hybrid", "vector"])
+async def test_chat_batch_search_modes(
+    app_client: AsyncClient, chat_payload: dict, ready_session: int, search_mode: str):
+    """
+    Test the POST /v1/session/{session_id}/batch endpoint with each search mode.
+    The questions are retrieved one by one, with maximal marginal relevance in vector mode.
+    """
+    batch_payload = {
+        "questions": [chat_payload["question"], "Who wrote the file?"],
+        "model": chat_payload["model"],
+        "search_mode": search_mode,
+        "k": 2,
+        "fetch_k": 5,
+        "mmr_lambda": 0.5,
+        "compression_ratio": 0.5,
+    }
+    response = await app_client.post(f"/v1/session/{ready_session}/batch", json=batch_payload)
+    assert response.status_code == status.HTTP_200_OK
+    chats = response.json()["details"]["chats"]
+    assert [chat["question"] for chat in chats] == batch_payload["questions"]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_successful(
+    app_client: AsyncClient, chat_payload: dict, ready_session: int):
+    """
+    Test the POST /v1/session/{session_id}/stream endpoint.
+    Stream the answer of a question in a session on an ingested file.
+    """
+    response = await app_client.post(f"/v1/session/{ready_session}/stream", json=chat_payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event for event in response.text.split("\n\n") if event]
+    assert events[0].startswith("event: delta")
+    assert events[-1].startswith("event: done")
+
+
+@pytest.mark.asyncio
+async def test_chat_cached_answer(
+    app_client: AsyncClient, chat_payload: dict, ready_session: int):
+    """
+    Test the POST /v1/session/{session_id} endpoint with the answer caches.
+    Ask the same question twice, once more with another max_tokens, which only
+    the semantic cache answers, then once more opting out of the caches.
+    """
+    response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+    assert response.status_code == status.HTTP_200_OK
+    first_chat = response.json()["details"]
+    assert first_chat["cached"] is False
+
+    response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+    assert response.status_code == status.HTTP_200_OK
+    cached_chat = response.json()["details"]
+    assert cached_chat["cached"] is True
+    assert cached_chat["answer"] == first_chat["answer"]
+    assert cached_chat["metadata_info"]["cached_chat_id"] == first_chat["chat_id"]
+
+    chat_payload["max_tokens"] = 200
+    response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["details"]["cached"] is True
+
+    chat_payload["use_cache"] = False
+    response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["details"]["cached"] is False
+
+
+@pytest.mark.asyncio
+async def test_chat_embedding_failure_not_cached(
+    app_client: AsyncClient, chat_payload: dict, ready_session: int, monkeypatch):
+    """
+    Test the POST /v1/session/{session_id} endpoint in hybrid mode when the question's embedding fails.
+    The question is answered with full-text search only, and the answer is not cached.
+    """
+    async def timeout(*args, **kwargs):
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(EmbeddingCacheCrud, "get_vector", timeout)
+    chat_payload.update({"question": "Which regions does the file list?", "search_mode": "hybrid"})
+    for _ in range(2):
+        response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["details"]["cached"] is False
+
+
+@pytest.mark.asyncio
+async def test_cache_stats(
+    app_client: AsyncClient, chat_payload: dict, ready_session: int):
+    """
+    Test the GET /v1/session/cache/stats endpoint.
+    Ask a question twice, then once more with another max_tokens, and compare the
+    counters before and after.
+    """
+    response = await app_client.get("/v1/session/cache/stats")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message"] == "Retrieved cache statistics successfully."
+    before = response.json()["details"]
+
+    chat_payload["question"] = "Which counters does the cache keep?"
+    for max_tokens in (300, 300, 200):
+        chat_payload["max_tokens"] = max_tokens
+        response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+        assert response.status_code == status.HTTP_200_OK
+
+    response = await app_client.get("/v1/session/cache/stats")
+    after = response.json()["details"]
+    assert (
+        after["answers"]["response"]["memory"]["hits"]
+        - before["answers"]["response"]["memory"]["hits"]
+    ) == 1
+    assert after["answers"]["semantic"]["hits"] - before["answers"]["semantic"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_max_tokens_exceeded(
+    app_client: AsyncClient, db_session: AsyncSession, chat_payload: dict, session_payload: dict, sample_document: dict):
+    """
+    Test the POST /v1/session/{session_id} endpoint with more max_tokens than the model allows.
+    The question is rejected before its document is searched, so the document has no chunks.
+    """
+    document_obj = Documents(**sample_document)
+    db_session.add(document_obj)
+    await db_session.commit()
+    await db_session.refresh(document_obj)
+    session_payload.update({"document_id": document_obj.id})
+    response = await app_client.post("/v1/session/", json=session_payload)
+    assert response.status_code == status.HTTP_200_OK
+    session_id = response.json()["details"]["session_id"]
+
+    chat_payload["max_tokens"] = 5000
+    response = await app_client.post(f"/v1/session/{session_id}", json=chat_payload)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["message"] == "max_tokens should be at most 4096 for gpt-4-turbo."
+
+
+@pytest.mark.asyncio
+async def test_chat_without_max_tokens(
+    app_client: AsyncClient, chat_payload: dict, ready_session: int):
+    """
+    Test the POST /v1/session/{session_id} endpoint without max_tokens, with a model whose
+    maximum output is its whole context window.
+    """
+    chat_payload.update({"model": "gpt-4", "max_tokens": None})
+    response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["details"]["cached"] is False
+
+
+@pytest.mark.asyncio
+async def test_chat_history_summary(
+    app_client: AsyncClient, db_session: AsyncSession, chat_payload: dict, ready_session: int):
+    """
+    Test the POST /v1/session/{session_id} endpoint with the session's history.
+    Ask one question more than the verbatim window holds, and check that the
+    oldest turn is folded into the session's summary.
+    """
+    chat_ids = []
+    chat_payload["use_history"] = True
+    for turn in range(5):
+        chat_payload["question"] = f"What does section {turn} of the file cover?"
+        response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+        assert response.status_code == status.HTTP_200_OK
+        chat_ids.append(response.json()["details"]["chat_id"])
+
+    metadata_info = await db_session.scalar(
+        select(ChatSessions.metadata_info).where(ChatSessions.id == ready_session)
+    )
+    assert metadata_info["memory"]["summarized_chat_id"] == chat_ids[0]
+    assert metadata_info["memory"]["summary"]
+
+
+@pytest.mark.asyncio
+async def test_chat_history_summary_batches(
+    app_client: AsyncClient, db_session: AsyncSession, chat_payload: dict, ready_session: int):
+    """
+    Test the POST /v1/session/{session_id} endpoint with more evicted turns than a summary batch.
+    Ask questions without history, then two with it, and check that each question folds
+    at most one batch of turns into the session's summary, oldest first.
+    """
+    chat_ids = []
+    for turn in range(7):
+        chat_payload["question"] = f"What does part {turn} of the file cover?"
+        response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+        assert response.status_code == status.HTTP_200_OK
+        chat_ids.append(response.json()["details"]["chat_id"])
+
+    chat_payload["use_history"] = True
+    for question, summarized_turn in (("And what comes after it?", 2), ("And then?", 4)):
+        chat_payload["question"] = question
+        response = await app_client.post(f"/v1/session/{ready_session}", json=chat_payload)
+        assert response.status_code == status.HTTP_200_OK
+
+        metadata_info = await db_session.scalar(
+            select(ChatSessions.metadata_info).where(ChatSessions.id == ready_session)
+        )
+        assert metadata_info["memory"]["summarized_chat_id"] == chat_ids[summarized_turn]
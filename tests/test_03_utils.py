@@ -0,0 +1,105 @@
+"""
+This module contains unit tests for the utilities that run without the API or the database.
+It includes tests for the extractive compression of retrieved chunks and for
+maximal marginal relevance.
+"""
+
+import numpy as np
+
+from app.utils.compression import compress_texts, score_sentences, split_sentences
+from app.utils.vector_search import build_matrix, mmr, top_k
+
+
+def test_split_sentences():
+    """
+    Test that a text is split at sentence-ending punctuation followed by whitespace.
+    """
+    text = "  Regions are isolated. Are zones too? Yes!  Version 1.5 is out.  "
+    assert split_sentences(text) == [
+        "Regions are isolated.",
+        "Are zones too?",
+        "Yes!",
+        "Version 1.5 is out.",
+    ]
+    assert split_sentences("   ") == []
+
+
+def test_score_sentences():
+    """
+    Test that sentences sharing rarer question terms score higher, and others score 0.
+    """
+    sentences = [
+        "A region is a geographic area.",
+        "Each region has several availability zones.",
+        "Pricing is billed per second.",
+    ]
+    scores = score_sentences("What are availability zones in a region?", sentences)
+    assert scores.shape == (3,)
+    assert scores[1] > scores[0] > 0
+    assert scores[2] == 0
+    assert not score_sentences("", sentences).any()
+    assert score_sentences("region", []).shape == (0,)
+
+
+def test_compress_texts_ratio():
+    """
+    Test that the kept sentences fit in the ratio of the texts' length, in their original order.
+    """
+    texts = [
+        "Zones are isolated. The sky is blue. Zones have their own power.",
+        "Cats sleep a lot. Zones are connected by fast links.",
+    ]
+    compressed = compress_texts(question="How are zones isolated?", texts=texts, ratio=0.5)
+    assert sum(len(text) for text in compressed) <= 0.5 * sum(len(text) for text in texts)
+    assert compressed[0].startswith("Zones are isolated.")
+    assert "The sky is blue." not in compressed[0]
+    assert "Cats sleep a lot." not in compressed[1]
+
+
+def test_compress_texts_keeps_best_sentence():
+    """
+    Test that the best sentence is kept even if it alone exceeds the ratio.
+    """
+    texts = ["Zones are isolated from each other by design. Cats sleep."]
+    compressed = compress_texts(question="Are zones isolated?", texts=texts, ratio=0.01)
+    assert compressed == ["Zones are isolated from each other by design."]
+
+
+def test_compress_texts_drops_unmatched_texts():
+    """
+    Test that a text without any kept sentence is compressed to an empty string.
+    """
+    texts = ["Zones are isolated.", "Cats sleep a lot during the day, every day."]
+    compressed = compress_texts(question="Are zones isolated?", texts=texts, ratio=0.3)
+    assert compressed == ["Zones are isolated.", ""]
+
+
+def test_mmr_relevance_only():
+    """
+    Test that MMR with a lambda of 1 selects the same rows as the top-k search.
+    """
+    rng = np.random.default_rng(0)
+    matrix = build_matrix(rng.standard_normal((50, 16)))
+    query = rng.standard_normal(16)
+    indices, _ = top_k(matrix, query, 5)
+    assert mmr(matrix, query, 5, 1.0).tolist() == indices.tolist()
+
+
+def test_mmr_skips_near_duplicates():
+    """
+    Test that MMR with a lambda below 1 skips a near-duplicate of a selected row.
+    """
+    matrix = build_matrix([[1.0, 0.0, 0.0], [0.99, 0.05, 0.0], [0.6, 0.8, 0.0]])
+    query = [1.0, 0.1, 0.0]
+    assert top_k(matrix, query, 2)[0].tolist() == [1, 0]
+    assert mmr(matrix, query, 2, 0.5).tolist() == [1, 2]
+
+
+def test_mmr_k_larger_than_candidates():
+    """
+    Test that MMR selects every row once when more rows are requested than there are.
+    """
+    matrix = build_matrix([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]])
+    selected = mmr(matrix, [1.0, 0.0], 10, 0.5)
+    assert sorted(selected.tolist()) == [0, 1, 2]
+    assert mmr(matrix[:0], [1.0, 0.0], 3, 0.5).size == 0